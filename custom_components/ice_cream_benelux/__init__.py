@@ -3,6 +3,10 @@
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 
+from .const import DOMAIN
+
+PLATFORMS = ["sensor"]
+
 
 async def async_setup(hass, config):
     """Set up the sensor platform."""
@@ -14,6 +18,25 @@ async def async_setup(hass, config):
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up entry."""
 
-    await hass.config_entries.async_forward_entry_setups(entry, ["sensor"])
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    entry.async_on_unload(entry.add_update_listener(async_update_options))
 
     return True
+
+
+async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Unload entry, shutting down the feeds no other entry uses."""
+    unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    if unload_ok:
+        await hass.data[DOMAIN].pop(entry.entry_id).async_unload()
+
+    return unload_ok
+
+
+async def async_update_options(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply changed options, reloading the entry only if it is not set up."""
+    sensors = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+    if sensors is None:
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+    await sensors.async_update()
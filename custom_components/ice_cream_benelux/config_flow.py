@@ -3,16 +3,44 @@
 import voluptuous as vol
 
 from homeassistant import config_entries
-from homeassistant.const import CONF_LATITUDE
-from homeassistant.core import HomeAssistant
+from homeassistant.const import CONF_LATITUDE, CONF_NAME
+from homeassistant.core import HomeAssistant, callback
 import homeassistant.helpers.config_validation as cv
 from homeassistant.helpers.selector import (
     SelectSelector,
     SelectSelectorConfig,
     SelectSelectorMode,
+    TimeSelector,
 )
 
-from .const import APP_NAME, COMPANIES, CONF_COMPANIES, CONF_LONGITUDE, DOMAIN
+from .const import (
+    APP_NAME,
+    COMPANIES,
+    CONF_ADD_LOCATION,
+    CONF_CLOSING_TIME,
+    CONF_COMPANIES,
+    CONF_CONNECT_TIMEOUT,
+    CONF_DISTANCE_THRESHOLD,
+    CONF_LOCATIONS,
+    CONF_LONGITUDE,
+    CONF_MAX_RADIUS,
+    CONF_MAX_REQUESTS_PER_HOST,
+    CONF_MIN_UPDATE_INTERVAL,
+    CONF_NEAREST_COUNT,
+    CONF_OPENING_TIME,
+    CONF_POSITION_THRESHOLD,
+    CONF_READ_TIMEOUT,
+    CONF_SCAN_INTERVAL,
+    CONF_TOTAL_TIMEOUT,
+    DEFAULT_DISTANCE_THRESHOLD,
+    DEFAULT_MAX_REQUESTS_PER_HOST,
+    DEFAULT_MIN_UPDATE_INTERVAL,
+    DEFAULT_NEAREST_COUNT,
+    DEFAULT_POSITION_THRESHOLD,
+    DOMAIN,
+    SCAN_INTERVAL,
+)
+from .utils_location import get_locations
 
 company_list = [{"label": value, "value": key} for key, value in COMPANIES.items()]
 
@@ -32,15 +60,141 @@ def get_data_schema(home_lat, home_lon):
                     translation_key="companies",
                 )
             ),
+            vol.Optional(CONF_MAX_RADIUS, default=0): vol.All(
+                vol.Coerce(float), vol.Range(min=0)
+            ),
+            vol.Optional(CONF_NEAREST_COUNT, default=DEFAULT_NEAREST_COUNT): vol.All(
+                vol.Coerce(int), vol.Range(min=1, max=10)
+            ),
+            vol.Optional(CONF_OPENING_TIME): TimeSelector(),
+            vol.Optional(CONF_CLOSING_TIME): TimeSelector(),
+            vol.Optional(CONF_ADD_LOCATION, default=False): cv.boolean,
         }
     )
 
 
+def get_location_schema():
+    """Get location schema."""
+    return vol.Schema(
+        {
+            vol.Required(CONF_NAME): cv.string,
+            vol.Required(CONF_LATITUDE): cv.positive_float,
+            vol.Required(CONF_LONGITUDE): cv.positive_float,
+            vol.Optional(CONF_ADD_LOCATION, default=False): cv.boolean,
+        }
+    )
+
+
+def get_options_schema(config):
+    """Get options schema.
+
+    Timeouts left empty fall back to the defaults of each provider.
+    """
+    location_names = [location[CONF_NAME] for location in config[CONF_LOCATIONS]]
+    schema = {
+        vol.Required(CONF_LATITUDE, default=config[CONF_LATITUDE]): cv.positive_float,
+        vol.Required(
+            CONF_LONGITUDE, default=config[CONF_LONGITUDE]
+        ): cv.positive_float,
+        vol.Required(CONF_COMPANIES, default=config[CONF_COMPANIES]): SelectSelector(
+            SelectSelectorConfig(
+                options=list(company_list),
+                mode=SelectSelectorMode.DROPDOWN,
+                multiple=True,
+                custom_value=True,
+                translation_key="companies",
+            )
+        ),
+    }
+    if location_names:
+        schema[vol.Optional(CONF_LOCATIONS, default=location_names)] = SelectSelector(
+            SelectSelectorConfig(options=location_names, multiple=True)
+        )
+    schema[
+        vol.Optional(
+            CONF_SCAN_INTERVAL,
+            default=config.get(CONF_SCAN_INTERVAL, int(SCAN_INTERVAL.total_seconds())),
+        )
+    ] = vol.All(vol.Coerce(int), vol.Range(min=10, max=300))
+    for key in (CONF_CONNECT_TIMEOUT, CONF_READ_TIMEOUT, CONF_TOTAL_TIMEOUT):
+        schema[
+            vol.Optional(key, description={"suggested_value": config.get(key)})
+        ] = vol.All(vol.Coerce(float), vol.Range(min=1, max=120))
+    schema[
+        vol.Optional(
+            CONF_MAX_REQUESTS_PER_HOST,
+            default=config.get(
+                CONF_MAX_REQUESTS_PER_HOST, DEFAULT_MAX_REQUESTS_PER_HOST
+            ),
+        )
+    ] = vol.All(vol.Coerce(int), vol.Range(min=1, max=10))
+    schema[
+        vol.Optional(
+            CONF_DISTANCE_THRESHOLD,
+            default=config.get(CONF_DISTANCE_THRESHOLD, DEFAULT_DISTANCE_THRESHOLD),
+        )
+    ] = vol.All(vol.Coerce(float), vol.Range(min=0))
+    schema[
+        vol.Optional(
+            CONF_POSITION_THRESHOLD,
+            default=config.get(CONF_POSITION_THRESHOLD, DEFAULT_POSITION_THRESHOLD),
+        )
+    ] = vol.All(vol.Coerce(float), vol.Range(min=0))
+    schema[
+        vol.Optional(
+            CONF_MIN_UPDATE_INTERVAL,
+            default=config.get(CONF_MIN_UPDATE_INTERVAL, DEFAULT_MIN_UPDATE_INTERVAL),
+        )
+    ] = vol.All(vol.Coerce(int), vol.Range(min=0, max=3600))
+    schema[vol.Optional(CONF_ADD_LOCATION, default=False)] = cv.boolean
+    return vol.Schema(schema)
+
+
+def get_unique_id(config) -> str:
+    """Get the unique ID of a configuration from its location and companies."""
+    selected_companies = "-".join(config[CONF_COMPANIES])
+    return f"{config[CONF_LATITUDE]}_{config[CONF_LONGITUDE]}_{selected_companies}"
+
+
+def get_location_errors(location, config) -> dict[str, str]:
+    """Validate a named location added to a configuration.
+
+    Sensors are keyed by company and coordinates, so a location at the
+    coordinates of another one would replace its sensors.
+    """
+    errors = {}
+    if any(
+        other[CONF_NAME] == location[CONF_NAME] for other in config[CONF_LOCATIONS]
+    ):
+        errors[CONF_NAME] = "duplicate_name"
+    if has_duplicate_locations(
+        {**config, CONF_LOCATIONS: [*config[CONF_LOCATIONS], location]}
+    ):
+        errors["base"] = "duplicate_location"
+    return errors
+
+
+def has_duplicate_locations(config) -> bool:
+    """Return whether locations of a configuration share their coordinates."""
+    coordinates = [(lat, lon) for _, lat, lon in get_locations(config)]
+    return len(set(coordinates)) < len(coordinates)
+
+
 class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Config flow."""
 
     VERSION = 1
 
+    def __init__(self) -> None:
+        """Initialize the config flow."""
+        self._data = {}
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        """Get the options flow for this handler."""
+        return OptionsFlow(config_entry)
+
     async def async_step_user(self, user_input=None):
         """Handle a flow initialized by the user."""
         if user_input is None:
@@ -52,10 +206,33 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         if errors:
             return self._show_form(user_input, self.hass, errors)
 
-        unique_id = self._generate_unique_id(validated_input)
-        self._abort_if_unique_id_configured(unique_id)
+        await self.async_set_unique_id(get_unique_id(validated_input))
+        self._abort_if_unique_id_configured()
+
+        add_location = validated_input.pop(CONF_ADD_LOCATION, False)
+        self._data = {**validated_input, CONF_LOCATIONS: []}
+        if add_location:
+            return await self.async_step_location()
+
+        return self.async_create_entry(title=APP_NAME, data=self._data)
+
+    async def async_step_location(self, user_input=None):
+        """Handle adding another named location."""
+        if user_input is None:
+            return self.async_show_form(
+                step_id="location", data_schema=get_location_schema()
+            )
+
+        add_location = user_input.pop(CONF_ADD_LOCATION, False)
+        if errors := get_location_errors(user_input, self._data):
+            return self.async_show_form(
+                step_id="location", data_schema=get_location_schema(), errors=errors
+            )
+        self._data[CONF_LOCATIONS].append(user_input)
+        if add_location:
+            return await self.async_step_location()
 
-        return self.async_create_entry(title=APP_NAME, data=validated_input)
+        return self.async_create_entry(title=APP_NAME, data=self._data)
 
     def _show_form(self, user_input, hass: HomeAssistant, errors=None):
         """Show the form to the user."""
@@ -70,7 +247,81 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             errors["base"] = "no_companies"
         return user_input
 
-    def _generate_unique_id(self, validated_input):
-        """Generate a unique ID based on validated input."""
-        selected_companies = "-".join(validated_input[CONF_COMPANIES])
-        return f"{validated_input[CONF_LATITUDE]}_{validated_input[CONF_LONGITUDE]}_{selected_companies}"
+
+class OptionsFlow(config_entries.OptionsFlow):
+    """Options flow."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        """Initialize the options flow."""
+        self._entry = config_entry
+        self._options = {}
+
+    async def async_step_init(self, user_input=None):
+        """Manage the options."""
+        config = {CONF_LOCATIONS: [], **self._entry.data, **self._entry.options}
+        errors = {}
+        if user_input is not None:
+            if not user_input[CONF_COMPANIES]:
+                errors["base"] = "no_companies"
+            elif self._is_configured(get_unique_id(user_input)):
+                errors["base"] = "already_configured"
+            else:
+                add_location = user_input.pop(CONF_ADD_LOCATION, False)
+                kept = user_input.pop(CONF_LOCATIONS, [])
+                self._options = {
+                    **user_input,
+                    CONF_LOCATIONS: [
+                        location
+                        for location in config[CONF_LOCATIONS]
+                        if location[CONF_NAME] in kept
+                    ],
+                }
+                if has_duplicate_locations(self._options):
+                    errors["base"] = "duplicate_location"
+                elif add_location:
+                    return await self.async_step_location()
+                else:
+                    return self._create_entry()
+
+        return self.async_show_form(
+            step_id="init", data_schema=get_options_schema(config), errors=errors
+        )
+
+    async def async_step_location(self, user_input=None):
+        """Handle adding another named location."""
+        if user_input is None:
+            return self.async_show_form(
+                step_id="location", data_schema=get_location_schema()
+            )
+
+        add_location = user_input.pop(CONF_ADD_LOCATION, False)
+        if errors := get_location_errors(user_input, self._options):
+            return self.async_show_form(
+                step_id="location", data_schema=get_location_schema(), errors=errors
+            )
+        self._options[CONF_LOCATIONS].append(user_input)
+        if add_location:
+            return await self.async_step_location()
+
+        return self._create_entry()
+
+    def _is_configured(self, unique_id: str) -> bool:
+        """Return whether another entry already has the configuration."""
+        return any(
+            entry.unique_id == unique_id
+            for entry in self.hass.config_entries.async_entries(DOMAIN)
+            if entry.entry_id != self._entry.entry_id
+        )
+
+    def _create_entry(self):
+        """Apply the options, with the unique ID following the configuration.
+
+        The options and unique ID are updated together, so the entry is only
+        updated once.
+        """
+        self.hass.config_entries.async_update_entry(
+            self._entry,
+            unique_id=get_unique_id(self._options),
+            options=self._options,
+        )
+        return self.async_create_entry(title="", data=self._options)
@@ -1,5 +1,7 @@
 """Constants for the Ice Cream Benelux integration."""
 
+from datetime import timedelta
+
 APP_NAME = "Ice Cream Benelux"
 DOMAIN = "ice_cream_benelux"
 
@@ -7,6 +9,55 @@ CONF_APP_NAME = "app_name"
 CONF_LATITUDE = "latitude"
 CONF_LONGITUDE = "longitude"
 CONF_COMPANIES = "companies"
+CONF_MAX_RADIUS = "max_radius"
+CONF_NEAREST_COUNT = "nearest_count"
+CONF_OPENING_TIME = "opening_time"
+CONF_CLOSING_TIME = "closing_time"
+CONF_LOCATIONS = "locations"
+CONF_ADD_LOCATION = "add_location"
+CONF_SCAN_INTERVAL = "scan_interval"
+CONF_CONNECT_TIMEOUT = "connect_timeout"
+CONF_READ_TIMEOUT = "read_timeout"
+CONF_TOTAL_TIMEOUT = "total_timeout"
+CONF_DISTANCE_THRESHOLD = "distance_threshold"
+CONF_POSITION_THRESHOLD = "position_threshold"
+CONF_MIN_UPDATE_INTERVAL = "min_update_interval"
+CONF_MAX_REQUESTS_PER_HOST = "max_requests_per_host"
+
+DATA_COORDINATORS = "coordinators"
+DATA_HTTP_CLIENT = "http_client"
+DATA_SNAPSHOTS = "snapshots"
+
+SCAN_INTERVAL = timedelta(seconds=30)
+FAST_SCAN_INTERVAL = timedelta(seconds=10)
+MAX_SCAN_INTERVAL = timedelta(minutes=5)
+# Delay between the first fetches of feeds restored from disk at startup
+STARTUP_STAGGER = timedelta(seconds=5)
+SNAPSHOT_SAVE_DELAY = 60  # seconds
+
+# Poll quickly while a van is within this distance in km
+NEAR_DISTANCE = 3.0
+# Distance changes in km below this are treated as GPS noise
+MOVEMENT_THRESHOLD = 0.05
+
+DEFAULT_NEAREST_COUNT = 3
+
+# Request timeouts in seconds, overridable in the integration options
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 10.0
+DEFAULT_TOTAL_TIMEOUT = 15.0
+# Concurrent requests to a single host, overridable in the integration options
+DEFAULT_MAX_REQUESTS_PER_HOST = 2
+
+# Sensor states are only written when the vans moved at least this much
+DEFAULT_DISTANCE_THRESHOLD = 0.05  # km
+DEFAULT_POSITION_THRESHOLD = 25  # m
+DEFAULT_MIN_UPDATE_INTERVAL = 0  # seconds
+
+# Number of positions kept per van to derive its speed and heading
+HISTORY_SIZE = 8
+
+STATUS_OUT_OF_RANGE = "out_of_range"
 
 COMPANIES = {
     "de_kremkerre_melle": "De Kremkerre Melle",
@@ -0,0 +1,635 @@
+"""Data update coordinators for ice_cream_benelux."""
+
+import asyncio
+from collections import Counter
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from http import HTTPStatus
+import logging
+from time import monotonic
+
+import aiohttp
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.update_coordinator import (
+    DataUpdateCoordinator,
+    UpdateFailed,
+)
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    CONF_CONNECT_TIMEOUT,
+    CONF_READ_TIMEOUT,
+    CONF_SCAN_INTERVAL,
+    CONF_TOTAL_TIMEOUT,
+    DATA_COORDINATORS,
+    DATA_HTTP_CLIENT,
+    DOMAIN,
+    MOVEMENT_THRESHOLD,
+    SCAN_INTERVAL,
+    STARTUP_STAGGER,
+)
+from .history import PositionHistory
+from .http_client import HTTPClient
+from .metrics import FeedMetrics
+from .providers import (
+    ADAPTER_ICECORP,
+    ADAPTERS,
+    ICECORP_COMPANY_URL,
+    PROVIDERS,
+    ProviderSpec,
+    RecordFilter,
+    RequestTimeouts,
+    Van,
+    normalize_vans,
+)
+from .scheduler import AdaptivePollingScheduler, OperatingHours
+from .snapshot import FeedSnapshots, get_feed_snapshots
+from .utils_location import ReferencePoint, haversine_matrix
+
+_LOGGER = logging.getLogger(__name__)
+
+_COMPANIES = {provider: company for company, provider in PROVIDERS.items()}
+
+
+@dataclass(frozen=True)
+class FeedSubscription:
+    """What a listening sensor needs from a feed, used to adapt polling."""
+
+    provider: ProviderSpec
+    reference: ReferencePoint
+    operating_hours: OperatingHours | None = None
+    bounding_box: tuple[float, float, float, float] | None = None
+
+
+class IceCreamFeedCoordinator(DataUpdateCoordinator):
+    """Coordinator fetching a single upstream feed once per poll.
+
+    Every sensor reading from the same endpoint URL shares one coordinator,
+    so the feed is requested once per cycle and the parsed payload is fanned
+    out to all listening sensors.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        url: str,
+        http: HTTPClient,
+        snapshots: FeedSnapshots | None = None,
+    ) -> None:
+        """Initialize the coordinator."""
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"{DOMAIN} {url}",
+            update_interval=SCAN_INTERVAL,
+            # Unchanged (304) payloads do not wake up the sensors
+            always_update=False,
+        )
+        self.url = url
+        self.entry_ids: set[str] = set()
+        # The entry showing the diagnostic sensors of the feed
+        self.diagnostics_entry_id: str | None = None
+        self.timeouts = RequestTimeouts()
+        self.last_updated_upstream: datetime | None = None
+        self.fetch_duration: float | None = None
+        self.metrics = FeedMetrics()
+        self._http = http
+        self._snapshots = snapshots
+        self._restored = False
+        self._vans: dict[ProviderSpec, list[Van]] = {}
+        self._vans_source = None
+        self._scheduler = AdaptivePollingScheduler()
+        self._previous_distances: dict[FeedSubscription, float | None] = {}
+        self._histories: dict[ProviderSpec, dict[str, PositionHistory]] = {}
+        self._distances: dict[ProviderSpec, tuple[list[Van], dict]] = {}
+        self._distances_source = None
+
+    async def _async_update_data(self):
+        """Fetch the feed, track the vans and plan the next poll.
+
+        Every request is bounded by `timeouts`, so a hung feed cannot stall
+        the update cycle. The vans of the listening sensors are kept in the
+        snapshots, to be served right after a restart. The next poll follows
+        the vans of the listening sensors, see `AdaptivePollingScheduler`.
+        """
+        start = monotonic()
+        data = await self._async_fetch()
+        self.fetch_duration = monotonic() - start
+        self.last_updated_upstream = dt_util.utcnow()
+        self._restored = False
+        subscriptions = list(self.async_contexts())
+        self._record_positions(data, subscriptions)
+        self._save_snapshot(data, subscriptions)
+        self.update_interval = self._next_update_interval(data, subscriptions)
+        return data
+
+    def _save_snapshot(self, data, subscriptions) -> None:
+        """Keep the vans of the listening sensors for after a restart."""
+        if self._snapshots is None or data is self.data:
+            return
+        providers = {subscription.provider for subscription in subscriptions}
+        self._snapshots.async_save(
+            self.url,
+            {
+                "last_updated_upstream": self.last_updated_upstream.isoformat(),
+                "vans": {
+                    _COMPANIES[provider]: [
+                        van.as_dict() for van in self._vans_from(data, provider)
+                    ]
+                    for provider in providers
+                },
+            },
+        )
+
+    def async_restore(self, snapshot: dict | None, delay: timedelta) -> bool:
+        """Serve the vans of a snapshot until the first fetch after a delay.
+
+        The restored vans are served from the normalized vans memo, with an
+        empty payload standing in for the feed.
+        """
+        if self.data is not None or not snapshot:
+            return False
+        self.data = {}
+        self._vans_source = self.data
+        self._vans = {
+            PROVIDERS[company]: [Van(**van) for van in vans]
+            for company, vans in snapshot["vans"].items()
+            if company in PROVIDERS
+        }
+        self.last_updated_upstream = dt_util.parse_datetime(
+            snapshot["last_updated_upstream"]
+        )
+        self._restored = True
+        self.update_interval = delay
+        return True
+
+    @property
+    def client_timeout(self) -> aiohttp.ClientTimeout:
+        """Return the timeout of a single request."""
+        return aiohttp.ClientTimeout(
+            total=self.timeouts.total,
+            connect=self.timeouts.connect,
+            sock_read=self.timeouts.read,
+        )
+
+    async def async_shutdown(self) -> None:
+        """Stop polling and free the payloads kept for the feed."""
+        await super().async_shutdown()
+        self._http.forget(self.url)
+        self.data = None
+        self._vans = {}
+        self._vans_source = None
+        self._distances = {}
+        self._distances_source = None
+        self._histories = {}
+        self._previous_distances = {}
+
+    @property
+    def companies(self) -> list[str]:
+        """Return the companies of the listening sensors."""
+        return sorted(
+            {
+                _COMPANIES[subscription.provider]
+                for subscription in self.async_contexts()
+            }
+        )
+
+    def set_scan_interval(self, scan_interval: timedelta) -> None:
+        """Set the poll interval used while vans are moving elsewhere."""
+        self._scheduler.base_interval = scan_interval
+
+    @property
+    def stale(self) -> bool:
+        """Return whether the data is restored or left over from a failed fetch.
+
+        When a fetch fails the last good payload is kept and served as stale
+        until the next successful fetch.
+        """
+        return self.data is not None and (
+            self._restored or not self.last_update_success
+        )
+
+    def _record_filter(self) -> RecordFilter | None:
+        """Return the filter keeping the records of the listening sensors.
+
+        Only feeds that can be streamed are filtered, and only once sensors
+        are listening.
+        """
+        providers = frozenset(
+            subscription.provider for subscription in self.async_contexts()
+        )
+        if not providers or not all(
+            ADAPTERS[provider.adapter].streamable for provider in providers
+        ):
+            return None
+        return RecordFilter(providers)
+
+    async def _async_fetch(self):
+        """Fetch the feed, dropping unwanted records while it streams in."""
+        json_data = await self._http.request_with_retry(
+            self.url,
+            timeout=self.client_timeout,
+            keep=self._record_filter(),
+            metrics=self.metrics,
+        )
+        if json_data == {}:
+            raise UpdateFailed(f"Error fetching {self.url}")
+        return json_data
+
+    def _record_positions(self, data, subscriptions) -> None:
+        """Add the current position of every listened-to van to its history.
+
+        Histories are kept per label, so vans without a label or sharing one
+        with another van get no history rather than one mixing their
+        positions.
+        """
+        timestamp = monotonic()
+        histories = {}
+        for provider in {subscription.provider for subscription in subscriptions}:
+            previous = self._histories.get(provider, {})
+            current = histories[provider] = {}
+            vans = self._vans_from(data, provider)
+            labels = Counter(van.label for van in vans)
+            for van in vans:
+                if not van.label or labels[van.label] > 1:
+                    continue
+                history = previous.get(van.label) or PositionHistory()
+                history.append(timestamp, van.latitude, van.longitude)
+                current[van.label] = history
+        # Vans that are gone no longer have a history
+        self._histories = histories
+
+    def position_history(
+        self, provider: ProviderSpec, label: str
+    ) -> PositionHistory | None:
+        """Return the position history of a van."""
+        return self._histories.get(provider, {}).get(label)
+
+    def _next_update_interval(self, data, subscriptions) -> timedelta:
+        """Plan the next poll from the vans seen by the listening sensors."""
+        distances = {}
+        nearest_distance = None
+        approaching = moving = False
+        for subscription in subscriptions:
+            # The distances are computed once, the sensors read them later
+            _, van_distances = self._distances_in(data, subscription)
+            distance = min(van_distances, default=None)
+            previous = self._previous_distances.get(subscription)
+            distances[subscription] = distance
+            if distance is None:
+                continue
+            if nearest_distance is None or distance < nearest_distance:
+                nearest_distance = distance
+            if previous is not None:
+                approaching |= previous - distance >= MOVEMENT_THRESHOLD
+                moving |= abs(previous - distance) >= MOVEMENT_THRESHOLD
+        self._previous_distances = distances
+
+        return self._scheduler.next_interval(
+            dt_util.now(),
+            [s.operating_hours for s in subscriptions if s.operating_hours],
+            nearest_distance,
+            approaching,
+            moving,
+        )
+
+    def _payload_from(self, data, company_id=None):
+        """Return the part of a payload relevant to a company."""
+        return data
+
+    def payload_for(self, company_id=None):
+        """Return the part of the payload relevant to a company."""
+        return self._payload_from(self.data, company_id)
+
+    def _vans_from(self, data, provider: ProviderSpec) -> list[Van]:
+        """Return the normalized vans of a provider in a payload.
+
+        The payload is normalized once per provider and poll, however many
+        sensors read it.
+        """
+        if self._vans_source is not data:
+            self._vans = {}
+            self._vans_source = data
+        if provider not in self._vans:
+            with self.metrics.parse_time.measure():
+                self._vans[provider] = normalize_vans(
+                    provider, self._payload_from(data, provider.company_id)
+                )
+        return self._vans[provider]
+
+    def distances_for(
+        self, subscription: FeedSubscription
+    ) -> tuple[list[Van], list[float]] | None:
+        """Return the vans of a provider and their distances to a location.
+
+        The distances from the vans to every location subscribed to the same
+        provider are computed together in one pass, once per poll.
+        """
+        if self.data is None:
+            return None
+        return self._distances_in(self.data, subscription)
+
+    def _distances_in(
+        self, data, subscription: FeedSubscription
+    ) -> tuple[list[Van], list[float]]:
+        """Return the vans of a provider in a payload and their distances."""
+        if self._distances_source is not data:
+            self._distances = {}
+            self._distances_source = data
+        provider = subscription.provider
+        ranked = self._distances.get(provider)
+        if ranked is None or subscription.reference not in ranked[1]:
+            with self.metrics.rank_time.measure():
+                ranked = self._distances[provider] = compute_distances(
+                    self._vans_from(data, provider),
+                    [
+                        subscription,
+                        *(s for s in self.async_contexts() if s.provider == provider),
+                    ],
+                )
+        vans, distances = ranked
+        return vans, distances[subscription.reference]
+
+
+def compute_distances(
+    vans: list[Van], subscriptions: list[FeedSubscription]
+) -> tuple[list[Van], dict[ReferencePoint, list[float]]]:
+    """Compute the distances from vans to the locations of subscriptions.
+
+    When every subscription has a bounding box, the vans outside all of them
+    are discarded first. Returns the remaining vans and, per location, the
+    distance to every one of them.
+    """
+    boxes = [subscription.bounding_box for subscription in subscriptions]
+    if all(boxes):
+        # Discard vans far from every location before any trigonometry
+        vans = [
+            van
+            for van in vans
+            if any(
+                min_lat <= van.latitude <= max_lat
+                and min_lon <= van.longitude <= max_lon
+                for min_lat, max_lat, min_lon, max_lon in boxes
+            )
+        ]
+    references = list(
+        dict.fromkeys(subscription.reference for subscription in subscriptions)
+    )
+    matrix = haversine_matrix(
+        [(van.latitude, van.longitude) for van in vans], references
+    )
+    return vans, dict(zip(references, matrix))
+
+
+class IcecorpCoordinator(IceCreamFeedCoordinator):
+    """Coordinator fetching all selected icecorp companies in one request.
+
+    The unfiltered icecorp feed is requested once and partitioned locally by
+    `company_id`. If the batched form is rejected, i.e. answered with a client
+    error or with a payload that cannot be partitioned, the coordinator falls
+    back to one request per selected company. When the feed is not answered
+    at all the update fails instead, so an outage does not multiply the
+    requests to the host.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        url: str,
+        http: HTTPClient,
+        snapshots: FeedSnapshots | None = None,
+    ) -> None:
+        """Initialize the coordinator."""
+        super().__init__(hass, url, http, snapshots)
+        self._added_company_ids: set[int] = set()
+        self._batched = True
+        self._last_payload = None
+        self._last_company_ids: frozenset[int] = frozenset()
+
+    def add_company(self, company_id: int) -> None:
+        """Include a company in the fetched feed until sensors listen."""
+        self._added_company_ids.add(company_id)
+
+    @property
+    def company_ids(self) -> set[int]:
+        """Return the companies to fetch.
+
+        These are the companies of the listening sensors, so companies no
+        longer used by any entry are dropped. Before any sensor listens, the
+        companies the feed was set up for are fetched.
+        """
+        return {
+            subscription.provider.company_id
+            for subscription in self.async_contexts()
+        } or self._added_company_ids
+
+    async def async_shutdown(self) -> None:
+        """Stop polling and free the payloads kept for the feed."""
+        await super().async_shutdown()
+        for company_id in self._added_company_ids:
+            self._http.forget(ICECORP_COMPANY_URL.format(company_id=company_id))
+        self._last_payload = None
+
+    async def _async_fetch(self):
+        """Fetch the feed and partition it by company."""
+        if self._batched:
+            json_data = await self._http.request_with_retry(
+                self.url, timeout=self.client_timeout, metrics=self.metrics
+            )
+            company_ids = self.company_ids
+            if (
+                json_data is self._last_payload
+                and company_ids == self._last_company_ids
+                and self.data is not None
+            ):
+                # Not modified since the last poll, for the same companies
+                return self.data
+            if json_data == {} and not _is_rejection(self._http.last_status(self.url)):
+                raise UpdateFailed(f"Error fetching {self.url}")
+            self._last_payload = json_data
+            self._last_company_ids = frozenset(company_ids)
+            partitioned = self._partition(
+                json_data.get("data") if isinstance(json_data, dict) else None
+            )
+            if partitioned is not None:
+                return partitioned
+            # The feed answered but cannot be partitioned, so stop asking
+            _LOGGER.warning(
+                "Batched icecorp feed rejected, falling back to per-company requests"
+            )
+            self._batched = False
+
+        company_ids = sorted(self.company_ids)
+        responses = await asyncio.gather(
+            *(
+                self._http.request_with_retry(
+                    ICECORP_COMPANY_URL.format(company_id=company_id),
+                    timeout=self.client_timeout,
+                    metrics=self.metrics,
+                )
+                for company_id in company_ids
+            )
+        )
+        if not any(responses):
+            raise UpdateFailed(f"Error fetching {self.url}")
+        return {
+            company_id: json_data.get("data", [])
+            for company_id, json_data in zip(company_ids, responses)
+        }
+
+    def _partition(self, vans) -> dict[int, list] | None:
+        """Partition the unfiltered feed by selected company."""
+        if not isinstance(vans, list):
+            return None
+        partitioned = {company_id: [] for company_id in self.company_ids}
+        for van in vans:
+            try:
+                company_id = int(van["company_id"])
+            except (KeyError, TypeError, ValueError):
+                # Without a company_id the feed cannot be partitioned
+                return None
+            if company_id in partitioned:
+                partitioned[company_id].append(van)
+        return partitioned
+
+    def _payload_from(self, data, company_id=None):
+        """Return the payload of a single company."""
+        if data is None:
+            return None
+        return {"data": data.get(company_id, [])}
+
+
+def _is_rejection(status: int | None) -> bool:
+    """Return whether a failed request was answered with a refusal.
+
+    Server errors, timeouts and rate limiting say nothing about the form of
+    the request, so they are not taken as a refusal.
+    """
+    if status is None or status >= HTTPStatus.INTERNAL_SERVER_ERROR:
+        return False
+    return status not in (HTTPStatus.REQUEST_TIMEOUT, HTTPStatus.TOO_MANY_REQUESTS)
+
+
+def get_http_client(hass: HomeAssistant) -> HTTPClient:
+    """Get the HTTP client shared by all feeds of the integration."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if DATA_HTTP_CLIENT not in domain_data:
+        domain_data[DATA_HTTP_CLIENT] = HTTPClient(
+            logger=_LOGGER, session=async_get_clientsession(hass)
+        )
+    return domain_data[DATA_HTTP_CLIENT]
+
+
+def get_timeouts(provider: ProviderSpec, options) -> RequestTimeouts:
+    """Get the request timeouts of a provider, overridden by the options."""
+    overrides = {
+        field: options[key]
+        for field, key in (
+            ("connect", CONF_CONNECT_TIMEOUT),
+            ("read", CONF_READ_TIMEOUT),
+            ("total", CONF_TOTAL_TIMEOUT),
+        )
+        if options.get(key)
+    }
+    return replace(provider.timeouts, **overrides)
+
+
+def get_feed_coordinator(
+    hass: HomeAssistant,
+    provider: ProviderSpec,
+    options=None,
+    entry_id: str | None = None,
+) -> IceCreamFeedCoordinator:
+    """Get the shared coordinator for a provider's feed, creating it if needed.
+
+    Providers publishing in the same feed share its coordinator, which is
+    held by every entry using it until released with
+    `async_release_feed_coordinator`. The scan interval and request timeouts
+    follow the options of the entry that last set up the feed.
+    """
+    coordinators = hass.data.setdefault(DOMAIN, {}).setdefault(DATA_COORDINATORS, {})
+    if provider.url not in coordinators:
+        coordinator_class = (
+            IcecorpCoordinator
+            if provider.adapter == ADAPTER_ICECORP
+            else IceCreamFeedCoordinator
+        )
+        coordinators[provider.url] = coordinator_class(
+            hass, provider.url, get_http_client(hass), get_feed_snapshots(hass)
+        )
+    coordinator = coordinators[provider.url]
+    if entry_id is not None:
+        coordinator.entry_ids.add(entry_id)
+    options = options or {}
+    coordinator.timeouts = get_timeouts(provider, options)
+    coordinator.set_scan_interval(
+        timedelta(seconds=options[CONF_SCAN_INTERVAL])
+        if options.get(CONF_SCAN_INTERVAL)
+        else SCAN_INTERVAL
+    )
+    if isinstance(coordinator, IcecorpCoordinator):
+        coordinator.add_company(provider.company_id)
+    return coordinator
+
+
+async def async_refresh_feeds(coordinators: list[IceCreamFeedCoordinator]) -> None:
+    """Refresh feeds concurrently, so the slowest feed sets the total time.
+
+    The HTTP client caps the concurrent requests per host, so feeds sharing a
+    host do not overload it.
+    """
+    start = monotonic()
+    await asyncio.gather(*(coordinator.async_refresh() for coordinator in coordinators))
+    _LOGGER.debug(
+        "Refreshed %d feeds in %.3f seconds (%s)",
+        len(coordinators),
+        monotonic() - start,
+        ", ".join(
+            f"{coordinator.url}: {coordinator.fetch_duration:.3f}"
+            for coordinator in coordinators
+            if coordinator.fetch_duration is not None
+        ),
+    )
+
+
+async def async_release_feed_coordinator(
+    hass: HomeAssistant, coordinator: IceCreamFeedCoordinator, entry_id: str
+) -> None:
+    """Release the hold of an entry on a feed, shutting down unused feeds.
+
+    Once the last feed is shut down the shared HTTP client is closed as well.
+    """
+    coordinator.entry_ids.discard(entry_id)
+    if coordinator.entry_ids:
+        return
+    domain_data = hass.data[DOMAIN]
+    coordinators = domain_data[DATA_COORDINATORS]
+    if coordinators.get(coordinator.url) is coordinator:
+        del coordinators[coordinator.url]
+    await coordinator.async_shutdown()
+    if not coordinators and DATA_HTTP_CLIENT in domain_data:
+        await domain_data.pop(DATA_HTTP_CLIENT).async_close()
+
+
+async def async_restore_feeds(
+    hass: HomeAssistant, coordinators: list[IceCreamFeedCoordinator]
+) -> list[IceCreamFeedCoordinator]:
+    """Restore the feeds that have not been fetched yet from their snapshots.
+
+    The first fetches of the restored feeds are staggered, so a restart does
+    not hit every upstream API at once. Returns the feeds without a snapshot.
+    """
+    snapshots = get_feed_snapshots(hass)
+    await snapshots.async_load()
+    unrestored = []
+    delay = STARTUP_STAGGER
+    for coordinator in sorted(coordinators, key=lambda feed: feed.url):
+        if coordinator.data is not None:
+            continue
+        if coordinator.async_restore(snapshots.get(coordinator.url), delay):
+            delay += STARTUP_STAGGER
+        else:
+            unrestored.append(coordinator)
+    return unrestored
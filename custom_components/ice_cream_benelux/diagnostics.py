@@ -0,0 +1,48 @@
+"""Diagnostics support for ice_cream_benelux."""
+
+from dataclasses import asdict
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import CONF_LATITUDE, CONF_LOCATIONS, CONF_LONGITUDE, DOMAIN
+from .coordinator import IceCreamFeedCoordinator
+
+TO_REDACT = {CONF_LATITUDE, CONF_LONGITUDE, CONF_LOCATIONS}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry, with the metrics of its feeds."""
+    sensors = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+    coordinators = sensors.coordinators if sensors is not None else set()
+    return {
+        "data": async_redact_data(dict(entry.data), TO_REDACT),
+        "options": async_redact_data(dict(entry.options), TO_REDACT),
+        "feeds": {
+            coordinator.url: feed_diagnostics(coordinator)
+            for coordinator in sorted(coordinators, key=lambda feed: feed.url)
+        },
+    }
+
+
+def feed_diagnostics(coordinator: IceCreamFeedCoordinator) -> dict[str, Any]:
+    """Return the state and metrics of a feed."""
+    last_updated_upstream = coordinator.last_updated_upstream
+    return {
+        "companies": coordinator.companies,
+        "last_update_success": coordinator.last_update_success,
+        "last_updated_upstream": last_updated_upstream.isoformat()
+        if last_updated_upstream
+        else None,
+        "stale": coordinator.stale,
+        "update_interval": coordinator.update_interval.total_seconds()
+        if coordinator.update_interval
+        else None,
+        "timeouts": asdict(coordinator.timeouts),
+        "fetch_duration": coordinator.fetch_duration,
+        "metrics": coordinator.metrics.as_dict(),
+    }
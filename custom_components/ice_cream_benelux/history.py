@@ -0,0 +1,84 @@
+"""Position history for ice_cream_benelux."""
+
+from array import array
+import math
+
+from .const import HISTORY_SIZE, MOVEMENT_THRESHOLD
+from .utils_location import ReferencePoint
+
+
+class PositionHistory:
+    """Fixed-size ring buffer of the recent positions of a van.
+
+    Positions are kept in flat arrays of doubles rather than per-sample
+    objects, so a history costs a few hundred bytes however long it lives.
+    """
+
+    __slots__ = ("_latitudes", "_longitudes", "_timestamps", "_head", "_count")
+
+    def __init__(self, size: int = HISTORY_SIZE) -> None:
+        """Initialize the history."""
+        self._latitudes = array("d", bytes(8 * size))
+        self._longitudes = array("d", bytes(8 * size))
+        self._timestamps = array("d", bytes(8 * size))
+        self._head = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        """Return the number of stored positions."""
+        return self._count
+
+    def append(self, timestamp: float, lat: float, lon: float) -> None:
+        """Store a position, overwriting the oldest one when full."""
+        size = len(self._timestamps)
+        if self._count and timestamp <= self._timestamps[(self._head - 1) % size]:
+            return
+        self._latitudes[self._head] = lat
+        self._longitudes[self._head] = lon
+        self._timestamps[self._head] = timestamp
+        self._head = (self._head + 1) % size
+        self._count = min(self._count + 1, size)
+
+    def _position(self, index: int) -> tuple[float, float, float]:
+        """Return (timestamp, lat, lon) of the index-th oldest position."""
+        size = len(self._timestamps)
+        slot = (self._head - self._count + index) % size
+        return self._timestamps[slot], self._latitudes[slot], self._longitudes[slot]
+
+    def motion(self, reference: ReferencePoint) -> dict | None:
+        """Derive the motion of the van relative to a reference point.
+
+        Returns the speed in km/h, the heading in degrees, the approach rate in
+        km/h (positive when coming closer) and the estimated time of arrival in
+        minutes, or None while fewer than two positions are known.
+        """
+        if self._count < 2:
+            return None
+        t1, lat1, lon1 = self._position(0)
+        t2, lat2, lon2 = self._position(self._count - 1)
+        hours = (t2 - t1) / 3600
+        moved = ReferencePoint(lat1, lon1).distance(lat2, lon2)
+        distance = reference.distance(lat2, lon2)
+        approach_rate = (reference.distance(lat1, lon1) - distance) / hours
+        eta = distance / approach_rate * 60 if approach_rate > 0 else None
+        return {
+            "speed": round(moved / hours, 1),
+            # A stationary van has no heading
+            "heading": round(bearing(lat1, lon1, lat2, lon2))
+            if moved >= MOVEMENT_THRESHOLD
+            else None,
+            "approach_rate": round(approach_rate, 1),
+            "eta": round(eta, 1) if eta is not None else None,
+        }
+
+
+def bearing(lat1, lon1, lat2, lon2) -> float:
+    """Calculate the initial bearing in degrees from one point to another."""
+    lat1 = math.radians(lat1)
+    lat2 = math.radians(lat2)
+    d_lon = math.radians(lon2 - lon1)
+    x = math.sin(d_lon) * math.cos(lat2)
+    y = math.cos(lat1) * math.sin(lat2) - math.sin(lat1) * math.cos(lat2) * math.cos(
+        d_lon
+    )
+    return math.degrees(math.atan2(x, y)) % 360
@@ -1,20 +1,220 @@
 """HTTP client for ice_cream_benelux."""
 
 import asyncio
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+from http import HTTPStatus
 import logging
+import random
+from time import monotonic
+from typing import Any
+from urllib.parse import urlsplit
 
 import aiohttp
 
+from .const import DEFAULT_MAX_REQUESTS_PER_HOST
+from .json_stream import read_json_array
+from .metrics import FeedMetrics
+
+try:
+    from orjson import loads as json_loads
+except ImportError:  # pragma: no cover
+    from json import loads as json_loads
+
 # Set the asyncio logger to WARNING to suppress INFO logs
 logging.getLogger("asyncio").setLevel(logging.WARNING)
 
 
+# Connection pool settings for a session owned by the client
+CONNECTION_LIMIT_PER_HOST = 4
+DNS_CACHE_TTL = 300  # seconds
+KEEPALIVE_TIMEOUT = 60  # seconds
+STREAM_CHUNK_SIZE = 16384  # bytes
+
+# Retry and circuit breaker settings
+MAX_WAIT_TIME = 30  # seconds
+DEFAULT_DEADLINE = 20  # seconds
+CIRCUIT_FAILURE_THRESHOLD = 3
+CIRCUIT_RECOVERY_TIME = 300  # seconds
+
+
+@dataclass
+class CachedResponse:
+    """Validators and parsed body of a previous response."""
+
+    etag: str | None
+    last_modified: str | None
+    data: Any
+
+
+class CircuitBreaker:
+    """Stop calling a host after repeated failed requests.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    requests are skipped. Once `recovery_time` has passed a single request is
+    let through to probe the host; success closes the circuit again.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        recovery_time: float = CIRCUIT_RECOVERY_TIME,
+    ) -> None:
+        """Initialize the circuit breaker."""
+        self._failure_threshold = failure_threshold
+        self._recovery_time = recovery_time
+        self._failures = 0
+        self._opened_at: float | None = None
+
+    @property
+    def is_open(self) -> bool:
+        """Return whether requests are currently being skipped."""
+        return self._opened_at is not None
+
+    def allow_request(self, now: float) -> bool:
+        """Return whether a request may be made."""
+        if self._opened_at is None:
+            return True
+        if now - self._opened_at >= self._recovery_time:
+            # Half open: block others until the probe has finished
+            self._opened_at = now
+            return True
+        return False
+
+    def record_success(self) -> None:
+        """Close the circuit."""
+        self._failures = 0
+        self._opened_at = None
+
+    def record_failure(self, now: float) -> None:
+        """Count a failed request, opening the circuit at the threshold."""
+        self._failures += 1
+        if self._failures >= self._failure_threshold:
+            self._opened_at = now
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Parse a Retry-After header into seconds."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=UTC)
+    return max((retry_at - datetime.now(UTC)).total_seconds(), 0.0)
+
+
 class HTTPClient:
-    """HTTP client for ice_cream_benelux."""
+    """HTTP client for ice_cream_benelux.
 
-    def __init__(self, logger: logging.Logger) -> None:
+    Requests go through a single long-lived, pooled session. Pass a session
+    (e.g. Home Assistant's shared one) to reuse it; otherwise the client
+    creates its own on first use and closes it in `async_close`.
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        session: aiohttp.ClientSession | None = None,
+        loads: Callable[[bytes], Any] = json_loads,
+    ) -> None:
         """Initialize the HTTP client."""
         self._logger = logger
+        self._loads = loads
+        self._session = session
+        self._owns_session = session is None
+        self._cache: dict[tuple[str, Callable | None], CachedResponse] = {}
+        self._in_flight: dict[tuple, asyncio.Future] = {}
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._statuses: dict[str, int | None] = {}
+        self._max_requests_per_host = DEFAULT_MAX_REQUESTS_PER_HOST
+        self._host_slots: dict[str, asyncio.Semaphore] = {}
+
+    @property
+    def max_requests_per_host(self) -> int:
+        """Return the number of requests that may run at once per host."""
+        return self._max_requests_per_host
+
+    @max_requests_per_host.setter
+    def max_requests_per_host(self, limit: int) -> None:
+        """Set the number of requests that may run at once per host."""
+        if limit != self._max_requests_per_host:
+            self._max_requests_per_host = limit
+            # Requests holding a slot finish on the old semaphores
+            self._host_slots = {}
+
+    def _host_slot(self, host: str) -> asyncio.Semaphore:
+        """Return the semaphore limiting the requests to a host."""
+        if host not in self._host_slots:
+            self._host_slots[host] = asyncio.Semaphore(self._max_requests_per_host)
+        return self._host_slots[host]
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Return the pooled session, creating it if needed."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit_per_host=CONNECTION_LIMIT_PER_HOST,
+                ttl_dns_cache=DNS_CACHE_TTL,
+                keepalive_timeout=KEEPALIVE_TIMEOUT,
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._owns_session = True
+        return self._session
+
+    async def async_close(self) -> None:
+        """Cancel the requests in flight and close the session if owned."""
+        for in_flight in self._in_flight.values():
+            in_flight.cancel()
+        self._in_flight.clear()
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+        self._session = None
+
+    def clear_cache(self) -> None:
+        """Drop all cached responses."""
+        self._cache.clear()
+
+    def forget(self, url: str) -> None:
+        """Drop the cached responses of a URL."""
+        for key in [key for key in self._cache if key[0] == url]:
+            del self._cache[key]
+        self._statuses.pop(url, None)
+
+    def last_status(self, url: str) -> int | None:
+        """Return the status of the last answer from a URL.
+
+        None if the last request was not answered at all, e.g. because of a
+        connection error, a timeout or an open circuit.
+        """
+        return self._statuses.get(url)
+
+    def _conditional_headers(self, key: tuple) -> dict[str, str]:
+        """Return the validators to send for a cached URL."""
+        cached = self._cache.get(key)
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+        return headers
+
+    def _store(self, key: tuple, response: aiohttp.ClientResponse, data: Any) -> None:
+        """Cache a response if it carries validators."""
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag or last_modified:
+            self._cache[key] = CachedResponse(etag, last_modified, data)
+        else:
+            self._cache.pop(key, None)
 
     async def request_with_retry(
         self,
@@ -24,10 +224,23 @@ class HTTPClient:
         wait_time: int = 2,
         retry_statuses=None,
         retry_on_empty: bool = True,
+        deadline: float = DEFAULT_DEADLINE,
+        keep: Callable[[Any], bool] | None = None,
+        metrics: FeedMetrics | None = None,
         **kwargs,
     ) -> dict:
         """Retry a request asynchronously.
 
+        Concurrent requests for the same method, URL and filter share a single
+        request and its result. Failed attempts are retried with jittered
+        exponential backoff, honoring Retry-After. A circuit breaker per host
+        skips requests while the host is down, and at most
+        `max_requests_per_host` requests run at once per host.
+
+        GET responses carrying an ETag or Last-Modified header are cached and
+        revalidated with a conditional request. Bodies are decoded with
+        `loads`, orjson when available.
+
         Parameters:
         ----------
         url : str
@@ -37,63 +250,219 @@ class HTTPClient:
         retries : int, optional
             Number of retries (default is 3).
         wait_time : int, optional
-            Wait time between retries in seconds (default is 2).
+            Initial wait time between retries in seconds, doubled after every
+            attempt and jittered (default is 2).
         retry_statuses : list, optional
             List of status codes to retry on (default is None).
         retry_on_empty : bool, optional
-            Whether to retry if response.text is empty (default is True).
+            Whether to retry if the response body is empty (default is True).
+        deadline : float, optional
+            Time in seconds the request may take with all its attempts. The
+            running attempt is cut off at the deadline and no retry is
+            started that could not begin before it (default is 20).
+        keep : callable, optional
+            Parse a JSON array response element by element off the stream and
+            keep only the elements it accepts. Must be hashable, requests with
+            equal filters share their cached response (default is None).
+        metrics : FeedMetrics, optional
+            Metrics to record the latency, size and outcome of every attempt
+            in. Requests joining one in flight are not recorded again
+            (default is None).
         kwargs : dict
             Additional arguments passed to aiohttp.ClientSession.request.
 
         Returns:
         -------
         dict
-            The json response.
+            The json response, or the cached object on 304 Not Modified. An
+            empty dict if every attempt failed.
 
         """
+        key = (method, url, keep)
+        in_flight = self._in_flight.get(key)
+        if in_flight is None:
+            in_flight = self._in_flight[key] = asyncio.ensure_future(
+                self._request_with_retry(
+                    url,
+                    method,
+                    retries,
+                    wait_time,
+                    retry_statuses,
+                    retry_on_empty,
+                    deadline,
+                    keep,
+                    metrics,
+                    **kwargs,
+                )
+            )
+            in_flight.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self._logger.debug("%s Joining request in flight", url)
+        # Shielded, so a cancelled caller does not cancel the others
+        return await asyncio.shield(in_flight)
+
+    async def _request_with_retry(
+        self,
+        url: str,
+        method: str,
+        retries: int,
+        wait_time: int,
+        retry_statuses,
+        retry_on_empty: bool,
+        deadline: float,
+        keep: Callable[[Any], bool] | None,
+        metrics: FeedMetrics | None,
+        **kwargs,
+    ) -> dict:
+        """Retry a request asynchronously, see `request_with_retry`."""
         if retry_statuses is None:
             retry_statuses = []
+        if metrics is None:
+            # Untracked requests are recorded in metrics nobody reads
+            metrics = FeedMetrics()
 
-        async with aiohttp.ClientSession() as session:
-            for attempt in range(retries):
-                try:
-                    async with session.request(method, url, **kwargs) as response:
-                        if response.status in retry_statuses or (
-                            retry_on_empty and not await response.text()
-                        ):
-                            self._logger.debug(
-                                "%s Attempt %d/%d failed with status %d or empty response. Retrying in %d seconds",
-                                url,
-                                attempt + 1,
-                                retries,
-                                response.status,
-                                wait_time,
+        self._statuses[url] = None
+        host = urlsplit(url).hostname
+        breaker = self._breakers.setdefault(host, CircuitBreaker())
+        start = monotonic()
+        if not breaker.allow_request(start):
+            self._logger.debug("%s Circuit open for %s, skipping request", url, host)
+            return {}
+
+        cache_key = (url, keep)
+        cacheable = method == "GET"
+        if cacheable:
+            kwargs["headers"] = {
+                **kwargs.get("headers", {}),
+                **self._conditional_headers(cache_key),
+            }
+
+        session = self._get_session()
+        for attempt in range(retries):
+            retry_after = None
+            attempt_start = monotonic()
+            self._statuses[url] = None
+            # The deadline also bounds the attempt that is running
+            remaining = deadline - (attempt_start - start)
+            try:
+                # Only the request itself holds a slot, not the backoff
+                async with (
+                    asyncio.timeout(remaining),
+                    self._host_slot(host),
+                    session.request(method, url, **kwargs) as response,
+                ):
+                    self._statuses[url] = response.status
+                    if (
+                        response.status == HTTPStatus.NOT_MODIFIED
+                        and cache_key in self._cache
+                    ):
+                        self._logger.debug("%s Not modified, using cache", url)
+                        metrics.record_response(monotonic() - attempt_start, 0, True)
+                        breaker.record_success()
+                        return self._cache[cache_key].data
+                    if keep is not None and response.status == HTTPStatus.OK:
+                        # Only the kept elements are ever held in memory
+                        body = b""
+                        try:
+                            data = await read_json_array(
+                                response.content.iter_chunked(STREAM_CHUNK_SIZE),
+                                self._loads,
+                                keep,
                             )
-                            await asyncio.sleep(wait_time)
-                        else:
-                            response.raise_for_status()  # Ensure the request was successful
-                            return await response.json()
-
-                except aiohttp.ClientResponseError as http_err:
-                    self._logger.error(
-                        "%s HTTP error occurred: %s. Attempt %d/%d. Retrying in %d seconds",
-                        url,
-                        str(http_err),
-                        attempt + 1,
-                        retries,
-                        wait_time,
-                    )
-                    await asyncio.sleep(wait_time)
-
-                except aiohttp.ClientError as req_err:
-                    self._logger.error(
-                        "%s Error during request: %s. Attempt %d/%d. Retrying in %d seconds",
-                        url,
-                        str(req_err),
-                        attempt + 1,
-                        retries,
-                        wait_time,
+                        except ValueError:
+                            # Answered, but not with a JSON array
+                            metrics.record_response(
+                                monotonic() - attempt_start,
+                                response.content.total_bytes,
+                                False,
+                            )
+                            raise
+                        empty = data is None
+                    else:
+                        body = await response.read()
+                        data = None
+                        empty = not body.strip()
+                    metrics.record_response(
+                        monotonic() - attempt_start,
+                        response.content.total_bytes,
+                        False,
                     )
-                    await asyncio.sleep(wait_time)
+                    if response.status in retry_statuses or (
+                        retry_on_empty and empty
+                    ):
+                        retry_after = parse_retry_after(
+                            response.headers.get("Retry-After")
+                        )
+                        log_level = logging.DEBUG
+                        error = (
+                            f"Failed with status {response.status} or empty response"
+                        )
+                    else:
+                        response.raise_for_status()  # Ensure the request was successful
+                        if data is None:
+                            data = self._loads(body)
+                        if cacheable:
+                            self._store(cache_key, response, data)
+                        breaker.record_success()
+                        return data
+
+            except aiohttp.ClientResponseError as http_err:
+                if http_err.headers:
+                    retry_after = parse_retry_after(http_err.headers.get("Retry-After"))
+                log_level = logging.ERROR
+                error = f"HTTP error occurred: {http_err}"
+
+            except (aiohttp.ClientError, asyncio.TimeoutError) as req_err:
+                metrics.record_error(monotonic() - attempt_start)
+                log_level = logging.ERROR
+                error = f"Error during request: {req_err!r}"
 
+            except ValueError as decode_err:
+                # An answer that is not JSON, e.g. the error page of a proxy
+                log_level = logging.ERROR
+                error = f"Invalid JSON response: {decode_err}"
+
+            delay = self._retry_delay(attempt, wait_time, retry_after)
+            if attempt + 1 >= retries or monotonic() + delay - start > deadline:
+                # No point in waiting when there will be no next attempt
+                self._logger.log(
+                    log_level,
+                    "%s %s. Attempt %d/%d. Giving up",
+                    url,
+                    error,
+                    attempt + 1,
+                    retries,
+                )
+                break
+            metrics.record_retry()
+            self._logger.log(
+                log_level,
+                "%s %s. Attempt %d/%d. Retrying in %.1f seconds",
+                url,
+                error,
+                attempt + 1,
+                retries,
+                delay,
+            )
+            await asyncio.sleep(delay)
+
+        metrics.record_failure()
+        breaker.record_failure(monotonic())
+        if breaker.is_open:
+            self._logger.warning(
+                "%s failed repeatedly, pausing requests to %s for %d seconds",
+                url,
+                host,
+                CIRCUIT_RECOVERY_TIME,
+            )
         return {}
+
+    @staticmethod
+    def _retry_delay(
+        attempt: int, wait_time: float, retry_after: float | None
+    ) -> float:
+        """Return the delay before the next attempt."""
+        if retry_after is not None:
+            return retry_after
+        # Full jitter spreads out the retries of concurrent clients
+        return random.uniform(0, min(wait_time * 2**attempt, MAX_WAIT_TIME))
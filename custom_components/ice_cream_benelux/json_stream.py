@@ -0,0 +1,107 @@
+"""Incremental JSON array parsing for ice_cream_benelux."""
+
+from collections.abc import AsyncIterable, Callable
+import re
+from typing import Any
+
+# Bytes that change the nesting, string or escape state
+_TOKENS = re.compile(rb'[][{}",\\]')
+
+
+class JSONArraySplitter:
+    """Split a JSON array arriving in chunks into the bytes of its elements.
+
+    Only the bytes that matter for nesting and strings are inspected, the
+    rest of a chunk is skipped over. Every element is handed out as soon as
+    it is complete, so a single element is buffered at a time.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the splitter."""
+        self._depth = 0
+        self._in_string = False
+        self._escaped: int | None = None
+        self._element = bytearray()
+        self.started = False
+        self.finished = False
+
+    def feed(self, chunk: bytes) -> list[bytes]:
+        """Feed a chunk, returning the elements completed by it."""
+        elements = []
+        start = 0
+        for match in _TOKENS.finditer(chunk):
+            pos = match.start()
+            if self._escaped is not None:
+                escaped, self._escaped = self._escaped, None
+                if pos == escaped:
+                    continue
+            token = chunk[pos : pos + 1]
+            if self._in_string:
+                if token == b'"':
+                    self._in_string = False
+                elif token == b"\\":
+                    self._escaped = pos + 1
+                continue
+            if self.finished:
+                raise ValueError("Data after the end of the JSON array")
+            if token == b'"':
+                self._in_string = True
+            elif token in b"[{":
+                if self._depth == 0:
+                    if token != b"[" or chunk[:pos].strip():
+                        raise ValueError("Not a JSON array")
+                    self.started = True
+                    start = pos + 1
+                self._depth += 1
+            elif token in b"]}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._element += chunk[start:pos]
+                    self._emit(elements)
+                    self.finished = True
+            elif token == b"," and self._depth == 1:
+                self._element += chunk[start:pos]
+                self._emit(elements)
+                start = pos + 1
+        if self._depth:
+            self._element += chunk[start:]
+        # An escape on the last byte carries over to the next chunk
+        if self._escaped is not None:
+            self._escaped -= len(chunk)
+        return elements
+
+    def _emit(self, elements: list[bytes]) -> None:
+        """Hand out the buffered element, if any."""
+        element = bytes(self._element).strip()
+        if element:
+            elements.append(element)
+        self._element = bytearray()
+
+
+async def read_json_array(
+    chunks: AsyncIterable[bytes],
+    loads: Callable[[bytes], Any],
+    keep: Callable[[Any], bool],
+) -> list | None:
+    """Parse a JSON array off a stream, keeping only the wanted elements.
+
+    Elements are decoded one at a time and dropped right away unless `keep`
+    accepts them. Returns None for an empty body, raises ValueError for a
+    body that is not a JSON array.
+    """
+    splitter = JSONArraySplitter()
+    kept = []
+    blank = True
+    async for chunk in chunks:
+        if blank and not splitter.started and not chunk.strip():
+            continue
+        blank = False
+        for element in splitter.feed(chunk):
+            record = loads(element)
+            if keep(record):
+                kept.append(record)
+    if blank:
+        return None
+    if not splitter.finished:
+        raise ValueError("Incomplete JSON array")
+    return kept
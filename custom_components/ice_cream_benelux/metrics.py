@@ -0,0 +1,147 @@
+"""Feed metrics for ice_cream_benelux."""
+
+from bisect import bisect_left
+from collections.abc import Iterator
+from contextlib import contextmanager
+from time import monotonic
+
+# Upper bounds of the request latency histogram buckets
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # seconds
+
+
+class DurationStats:
+    """Count, total and last value of a repeatedly measured duration."""
+
+    __slots__ = ("count", "total", "last")
+
+    def __init__(self) -> None:
+        """Initialize the statistics."""
+        self.count = 0
+        self.total = 0.0
+        self.last: float | None = None
+
+    def record(self, duration: float) -> None:
+        """Record a duration in seconds."""
+        self.count += 1
+        self.total += duration
+        self.last = duration
+
+    @contextmanager
+    def measure(self) -> Iterator[None]:
+        """Record the duration of a block."""
+        start = monotonic()
+        try:
+            yield
+        finally:
+            self.record(monotonic() - start)
+
+    @property
+    def average(self) -> float | None:
+        """Return the average duration in seconds."""
+        return self.total / self.count if self.count else None
+
+    def as_dict(self) -> dict:
+        """Return the statistics in milliseconds."""
+        return {
+            "count": self.count,
+            "last_ms": milliseconds(self.last),
+            "average_ms": milliseconds(self.average),
+        }
+
+
+class LatencyHistogram(DurationStats):
+    """Duration statistics with the durations counted per bucket."""
+
+    __slots__ = ("buckets",)
+
+    def __init__(self) -> None:
+        """Initialize the histogram."""
+        super().__init__()
+        # The last bucket counts what is slower than the slowest bound
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def record(self, duration: float) -> None:
+        """Record a duration in seconds."""
+        super().record(duration)
+        self.buckets[bisect_left(LATENCY_BUCKETS, duration)] += 1
+
+    def as_dict(self) -> dict:
+        """Return the statistics in milliseconds, with the bucket counts."""
+        return {
+            **super().as_dict(),
+            "buckets": {
+                **{
+                    f"le_{bound:g}s": count
+                    for bound, count in zip(LATENCY_BUCKETS, self.buckets)
+                },
+                "slower": self.buckets[-1],
+            },
+        }
+
+
+class FeedMetrics:
+    """Request and processing metrics of a feed, kept since it was set up.
+
+    The HTTP client records every attempt at requesting the feed, so retries
+    and Not Modified answers show up here. The coordinator records the time
+    spent normalizing the payload and computing the distances to the vans.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the metrics."""
+        self.latency = LatencyHistogram()
+        self.parse_time = DurationStats()
+        self.rank_time = DurationStats()
+        self.retries = 0
+        self.failures = 0
+        self.not_modified = 0
+        self.bytes_received = 0
+        self.last_size: int | None = None
+
+    def record_response(self, latency: float, size: int, not_modified: bool) -> None:
+        """Record an answered attempt."""
+        self.latency.record(latency)
+        if not_modified:
+            self.not_modified += 1
+        else:
+            self.bytes_received += size
+            self.last_size = size
+
+    def record_error(self, latency: float) -> None:
+        """Record an attempt that failed without an answer."""
+        self.latency.record(latency)
+
+    def record_retry(self) -> None:
+        """Record that an attempt is retried."""
+        self.retries += 1
+
+    def record_failure(self) -> None:
+        """Record a request that failed after all its attempts."""
+        self.failures += 1
+
+    @property
+    def cache_hit_ratio(self) -> float | None:
+        """Return the share of requests answered with Not Modified."""
+        if not self.latency.count:
+            return None
+        return self.not_modified / self.latency.count
+
+    def as_dict(self) -> dict:
+        """Return the metrics for diagnostics."""
+        return {
+            "requests": self.latency.count,
+            "retries": self.retries,
+            "failures": self.failures,
+            "not_modified": self.not_modified,
+            "cache_hit_ratio": self.cache_hit_ratio,
+            "bytes_received": self.bytes_received,
+            "last_size": self.last_size,
+            "latency": self.latency.as_dict(),
+            "parse_time": self.parse_time.as_dict(),
+            "rank_time": self.rank_time.as_dict(),
+        }
+
+
+def milliseconds(seconds: float | None) -> float | None:
+    """Convert seconds to rounded milliseconds."""
+    return None if seconds is None else round(seconds * 1000, 1)
@@ -0,0 +1,238 @@
+"""Ice cream van providers for ice_cream_benelux.
+
+Each company is described by a `ProviderSpec`: the feed it is published in,
+the adapter that knows the layout of that feed and, for shared feeds, how to
+pick out the company's vans. Adding a company is a matter of adding a spec.
+"""
+
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from .const import DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT, DEFAULT_TOTAL_TIMEOUT
+
+IJSJESRADAR_URL = "https://ijsjesradar.be/status.php"
+ICECORP_URL = "https://api.icecorp.be/v1/icecreamvanmarkerdata?has_working_day=1"
+ICECORP_COMPANY_URL = "https://api.icecorp.be/v1/icecreamvanmarkerdata?company_id={company_id}&has_working_day=1"
+PITZ_URL = "https://map-pitz-ijs.vercel.app/api/?purge=false"
+VAN_DE_WALLE_URL = "https://www.ijsvandewalle.be/map/result.json"
+
+ADAPTER_ICECORP = "icecorp"
+ADAPTER_IJSJESRADAR = "ijsjesradar"
+ADAPTER_PITZ = "pitz"
+ADAPTER_VAN_DE_WALLE = "van_de_walle"
+
+
+class Van:
+    """A van as read from a feed.
+
+    Slotted, as every feed yields a van per poll and several are kept per
+    sensor. Converted to a dict only for state attributes and storage.
+    """
+
+    __slots__ = ("label", "latitude", "longitude", "status")
+
+    def __init__(
+        self, label: str, latitude: float, longitude: float, status: str | None
+    ) -> None:
+        """Initialize the van."""
+        self.label = label
+        self.latitude = latitude
+        self.longitude = longitude
+        self.status = status
+
+    def __repr__(self) -> str:
+        """Return the representation of the van."""
+        return (
+            f"Van({self.label!r}, {self.latitude}, {self.longitude}, {self.status!r})"
+        )
+
+    def __eq__(self, other) -> bool:
+        """Return whether two vans are the same van at the same place."""
+        if not isinstance(other, Van):
+            return NotImplemented
+        return self.as_dict() == other.as_dict()
+
+    def as_dict(self) -> dict:
+        """Return the van as a dict."""
+        return {
+            "label": self.label,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "status": self.status,
+        }
+
+
+@dataclass(frozen=True)
+class FeedAdapter:
+    """Layout of the van records in a feed."""
+
+    records: Callable[[Any], list]
+    label: str
+    latitude: tuple[str, ...]
+    longitude: tuple[str, ...]
+    status: Callable[[dict], str | None]
+    default_label: str | None = None
+    include: Callable[[dict], bool] = lambda van: True
+    # Whether the feed is a JSON array that can be filtered while streamed
+    streamable: bool = False
+
+
+@dataclass(frozen=True)
+class RequestTimeouts:
+    """Time limits in seconds for a single feed request."""
+
+    connect: float = DEFAULT_CONNECT_TIMEOUT
+    read: float = DEFAULT_READ_TIMEOUT
+    total: float = DEFAULT_TOTAL_TIMEOUT
+
+
+@dataclass(frozen=True)
+class ProviderSpec:
+    """Where and how to find the vans of a company."""
+
+    url: str
+    adapter: str
+    company_filter: tuple[tuple[str, Any], ...] = field(default=())
+    company_id: int | None = None
+    timeouts: RequestTimeouts = field(default=RequestTimeouts())
+
+
+ADAPTERS = {
+    ADAPTER_ICECORP: FeedAdapter(
+        records=lambda payload: payload.get("data", []),
+        label="title",
+        default_label="",
+        latitude=("latitude",),
+        longitude=("longitude",),
+        status=lambda van: (van.get("status") or "").lower(),
+    ),
+    ADAPTER_IJSJESRADAR: FeedAdapter(
+        records=lambda payload: payload,
+        label="name",
+        latitude=("location", "lat"),
+        longitude=("location", "lon"),
+        status=lambda van: van.get("status"),
+        include=lambda van: van.get("status") == "online",
+        streamable=True,
+    ),
+    ADAPTER_PITZ: FeedAdapter(
+        records=lambda payload: payload,
+        label="naam",
+        latitude=("lat",),
+        longitude=("lng",),
+        status=lambda van: "active" if van.get("active") else "inactive",
+        include=lambda van: bool(van.get("active")),
+    ),
+    ADAPTER_VAN_DE_WALLE: FeedAdapter(
+        records=lambda payload: payload,
+        label="label",
+        default_label="",
+        latitude=("latitude",),
+        longitude=("longitude",),
+        status=lambda van: van.get("status"),
+    ),
+}
+
+PROVIDERS = {
+    "de_kremkerre_melle": ProviderSpec(
+        url=IJSJESRADAR_URL,
+        adapter=ADAPTER_IJSJESRADAR,
+        company_filter=(("company_ref", "de-kremkerre"),),
+    ),
+    "de_krijmboer_lommel": ProviderSpec(
+        url=ICECORP_URL, adapter=ADAPTER_ICECORP, company_id=10
+    ),
+    "foubert_sint_niklaas": ProviderSpec(
+        url=ICECORP_URL, adapter=ADAPTER_ICECORP, company_id=2
+    ),
+    "glace_de_bock_beveren": ProviderSpec(
+        url=IJSJESRADAR_URL,
+        adapter=ADAPTER_IJSJESRADAR,
+        company_filter=(("company_ref", "de-bock"),),
+    ),
+    "het_boerenijsje_loenhout": ProviderSpec(
+        url=ICECORP_URL, adapter=ADAPTER_ICECORP, company_id=12
+    ),
+    "het_droomijsje_breskens": ProviderSpec(
+        url=IJSJESRADAR_URL,
+        adapter=ADAPTER_IJSJESRADAR,
+        company_filter=(("company_ref", "het-droomijsje"),),
+    ),
+    "joris_beerse": ProviderSpec(url=ICECORP_URL, adapter=ADAPTER_ICECORP, company_id=4),
+    "pitz_stekene": ProviderSpec(
+        url=PITZ_URL,
+        adapter=ADAPTER_PITZ,
+        # Serverless endpoint, the first request after a while starts it up
+        timeouts=RequestTimeouts(read=15.0, total=20.0),
+    ),
+    "tartiste_deinze": ProviderSpec(
+        url=ICECORP_URL, adapter=ADAPTER_ICECORP, company_id=8
+    ),
+    "van_de_walle_temse": ProviderSpec(
+        url=VAN_DE_WALLE_URL, adapter=ADAPTER_VAN_DE_WALLE
+    ),
+    "vanilla_plus_oostende": ProviderSpec(
+        url=ICECORP_URL, adapter=ADAPTER_ICECORP, company_id=11
+    ),
+}
+
+
+@dataclass(frozen=True)
+class RecordFilter:
+    """Keep the records of a feed belonging to any of some providers.
+
+    Hashable, so the HTTP client can cache the filtered feed per filter.
+    """
+
+    providers: frozenset[ProviderSpec]
+
+    def __call__(self, van) -> bool:
+        """Return whether a record is wanted."""
+        return isinstance(van, dict) and any(
+            _matches(provider, van) for provider in self.providers
+        )
+
+
+def _matches(provider: ProviderSpec, van: dict) -> bool:
+    """Return whether a record is an included van of the provider's company."""
+    return all(
+        van.get(key) == value for key, value in provider.company_filter
+    ) and ADAPTERS[provider.adapter].include(van)
+
+
+def _get_path(van: dict, path: tuple[str, ...]):
+    """Get a nested value from a van record."""
+    value = van
+    for key in path:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def normalize_vans(provider: ProviderSpec, payload) -> list[Van]:
+    """Normalize the vans of a provider from a feed payload.
+
+    Returns every van of the company that has a location.
+    """
+    if not payload:
+        return []
+    adapter = ADAPTERS[provider.adapter]
+    vans = []
+    for van in adapter.records(payload):
+        if not _matches(provider, van):
+            continue
+        lat = _get_path(van, adapter.latitude)
+        lon = _get_path(van, adapter.longitude)
+        if lat is None or lon is None:
+            continue
+        vans.append(
+            Van(
+                van.get(adapter.label, adapter.default_label),
+                lat,
+                lon,
+                adapter.status(van),
+            )
+        )
+    return vans
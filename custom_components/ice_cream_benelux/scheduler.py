@@ -0,0 +1,87 @@
+"""Adaptive polling for ice_cream_benelux."""
+
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+
+from .const import (
+    FAST_SCAN_INTERVAL,
+    MAX_SCAN_INTERVAL,
+    NEAR_DISTANCE,
+    SCAN_INTERVAL,
+)
+
+
+@dataclass(frozen=True)
+class OperatingHours:
+    """Daily window in which ice cream vans are expected to drive."""
+
+    opening: time
+    closing: time
+
+    def is_open(self, now: datetime) -> bool:
+        """Return whether the window is open at a moment."""
+        current = now.time()
+        if self.opening <= self.closing:
+            return self.opening <= current < self.closing
+        # The window spans midnight
+        return current >= self.opening or current < self.closing
+
+    def until_open(self, now: datetime) -> timedelta:
+        """Return the time until the window opens next."""
+        opening = datetime.combine(now.date(), self.opening, tzinfo=now.tzinfo)
+        if opening <= now:
+            opening += timedelta(days=1)
+        return opening - now
+
+
+class AdaptivePollingScheduler:
+    """Decide how long to wait before polling a feed again.
+
+    Polls quickly while a van is near or approaching, at the normal interval
+    while vans are moving elsewhere, and backs off exponentially while the
+    feed is empty or every van is stationary. Outside the operating hours it
+    waits until the next opening.
+    """
+
+    def __init__(
+        self,
+        fast_interval: timedelta = FAST_SCAN_INTERVAL,
+        base_interval: timedelta = SCAN_INTERVAL,
+        max_interval: timedelta = MAX_SCAN_INTERVAL,
+        near_distance: float = NEAR_DISTANCE,
+    ) -> None:
+        """Initialize the scheduler."""
+        self._fast_interval = fast_interval
+        self.base_interval = base_interval
+        self._max_interval = max_interval
+        self._near_distance = near_distance
+        self._idle_polls = 0
+
+    def next_interval(
+        self,
+        now: datetime,
+        operating_hours: list[OperatingHours],
+        nearest_distance: float | None,
+        approaching: bool,
+        moving: bool,
+    ) -> timedelta:
+        """Return the interval until the next poll."""
+        if operating_hours and not any(hours.is_open(now) for hours in operating_hours):
+            self._idle_polls = 0
+            return max(
+                min(hours.until_open(now) for hours in operating_hours),
+                self.base_interval,
+            )
+
+        if nearest_distance is not None and (
+            approaching or nearest_distance <= self._near_distance
+        ):
+            self._idle_polls = 0
+            return self._fast_interval
+
+        if moving:
+            self._idle_polls = 0
+            return self.base_interval
+
+        self._idle_polls += 1
+        return min(self.base_interval * 2**self._idle_polls, self._max_interval)
@@ -1,15 +1,67 @@
 """Sensor platform for ice_cream_benelux."""
 
+from collections.abc import Callable
+from dataclasses import dataclass
 import logging
-
-from homeassistant.components.sensor import SensorDeviceClass, SensorEntity
+from time import monotonic
+from urllib.parse import urlsplit
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
-
-from .const import APP_NAME, CONF_APP_NAME, CONF_LATITUDE, CONF_LONGITUDE
-from .http_client import HTTPClient
-from .utils_location import haversine
-from .utils_string import snake_to_pascal_case
+from homeassistant.const import (
+    PERCENTAGE,
+    EntityCategory,
+    UnitOfInformation,
+    UnitOfTime,
+)
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    APP_NAME,
+    CONF_APP_NAME,
+    CONF_CLOSING_TIME,
+    CONF_COMPANIES,
+    CONF_DISTANCE_THRESHOLD,
+    CONF_MAX_RADIUS,
+    CONF_MAX_REQUESTS_PER_HOST,
+    CONF_MIN_UPDATE_INTERVAL,
+    CONF_NEAREST_COUNT,
+    CONF_OPENING_TIME,
+    CONF_POSITION_THRESHOLD,
+    DEFAULT_DISTANCE_THRESHOLD,
+    DEFAULT_MAX_REQUESTS_PER_HOST,
+    DEFAULT_MIN_UPDATE_INTERVAL,
+    DEFAULT_NEAREST_COUNT,
+    DEFAULT_POSITION_THRESHOLD,
+    DOMAIN,
+    STATUS_OUT_OF_RANGE,
+)
+from .coordinator import (
+    FeedSubscription,
+    IceCreamFeedCoordinator,
+    async_refresh_feeds,
+    async_release_feed_coordinator,
+    async_restore_feeds,
+    get_feed_coordinator,
+    get_http_client,
+)
+from .metrics import FeedMetrics, milliseconds
+from .providers import PROVIDERS, ProviderSpec, Van
+from .scheduler import OperatingHours
+from .utils_location import (
+    ReferencePoint,
+    get_locations,
+    haversine,
+    nearest_indices,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -18,38 +70,240 @@ async def async_setup_entry(
     hass: HomeAssistant, config_entry: ConfigEntry, async_add_entities
 ):
     """Set up entry."""
-    app_config = {
-        CONF_APP_NAME: APP_NAME,
-    }
-    lat = config_entry.data.get(CONF_LATITUDE)
-    lon = config_entry.data.get(CONF_LONGITUDE)
-    companies = config_entry.data.get("companies")
-
-    sensors = []
-    for company in companies:
-        sensor_class_name = snake_to_pascal_case(company) + "Sensor"
-        sensor_class = globals().get(sensor_class_name)
-        config = {**app_config, **config_entry.data}
-        if sensor_class:
-            sensors.append(sensor_class(config, company, lat, lon))
-        else:
-            _LOGGER.error("No sensor class found for %s", company)
-
-    async_add_entities(sensors, True)
-
-
-class IceCreamVanSensor(SensorEntity):
+    sensors = EntrySensors(hass, config_entry, async_add_entities)
+    hass.data.setdefault(DOMAIN, {})[config_entry.entry_id] = sensors
+    await sensors.async_update()
+
+
+def get_entry_config(config_entry: ConfigEntry) -> dict:
+    """Get the configuration of an entry, with its options applied."""
+    return {CONF_APP_NAME: APP_NAME, **config_entry.data, **config_entry.options}
+
+
+class EntrySensors:
+    """The sensors of a config entry, kept in step with its options.
+
+    Changing the options only adds the sensors of new companies or locations
+    and removes those no longer configured. The other sensors and the shared
+    feeds, with their cached payloads, are left running. Feeds no longer used
+    by the entry are released.
+
+    Every feed also gets diagnostic sensors showing its metrics, see
+    `FEED_METRICS`. They are shown by one of the entries using the feed and
+    handed over to another entry when that entry releases the feed.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, config_entry: ConfigEntry, async_add_entities
+    ) -> None:
+        """Initialize the sensors."""
+        self._hass = hass
+        self._entry = config_entry
+        self._async_add_entities = async_add_entities
+        self._sensors: dict[tuple[str, float, float], IceCreamVanSensor] = {}
+        self._diagnostics: dict[tuple[str, str], FeedMetricSensor] = {}
+        self._coordinators: set[IceCreamFeedCoordinator] = set()
+
+    @property
+    def coordinators(self) -> set[IceCreamFeedCoordinator]:
+        """Return the feeds used by the entry."""
+        return self._coordinators
+
+    async def async_update(self) -> None:
+        """Add and remove sensors to match the configuration."""
+        config = get_entry_config(self._entry)
+        locations = get_locations(config)
+        thresholds = get_update_thresholds(config)
+        get_http_client(self._hass).max_requests_per_host = config.get(
+            CONF_MAX_REQUESTS_PER_HOST, DEFAULT_MAX_REQUESTS_PER_HOST
+        )
+
+        sensors = {}
+        for company in config.get(CONF_COMPANIES):
+            provider = PROVIDERS.get(company)
+            if provider:
+                # One feed per provider, one sensor per location
+                coordinator = get_feed_coordinator(
+                    self._hass, provider, config, self._entry.entry_id
+                )
+                for location_name, lat, lon in locations:
+                    key = (company, lat, lon)
+                    sensors[key] = self._sensors.get(key) or IceCreamVanSensor(
+                        config, company, lat, lon, coordinator, provider, location_name
+                    )
+                    sensors[key].thresholds = thresholds
+            else:
+                _LOGGER.error("No provider found for %s", company)
+
+        coordinators = {sensor.coordinator for sensor in sensors.values()}
+        diagnostics = {}
+        for coordinator in coordinators:
+            if coordinator.diagnostics_entry_id is None:
+                coordinator.diagnostics_entry_id = self._entry.entry_id
+            if coordinator.diagnostics_entry_id == self._entry.entry_id:
+                diagnostics.update(self._feed_diagnostics(config, coordinator))
+
+        added = [sensor for key, sensor in sensors.items() if key not in self._sensors]
+        added_diagnostics = [
+            sensor
+            for key, sensor in diagnostics.items()
+            if key not in self._diagnostics
+        ]
+        removed = [
+            sensor for key, sensor in self._sensors.items() if key not in sensors
+        ] + [
+            sensor
+            for key, sensor in self._diagnostics.items()
+            if key not in diagnostics
+        ]
+        self._sensors = sensors
+        self._diagnostics = diagnostics
+
+        for sensor in removed:
+            if sensor.registry_entry:
+                # Removing the registry entry removes the entity too
+                er.async_get(self._hass).async_remove(sensor.entity_id)
+            else:
+                await sensor.async_remove()
+
+        for coordinator in self._coordinators - coordinators:
+            await self._async_release(coordinator)
+        self._coordinators = coordinators
+
+        # Feeds restored from disk give the sensors a state right away
+        unrestored = await async_restore_feeds(
+            self._hass, list({sensor.coordinator for sensor in added})
+        )
+
+        self._async_add_entities(added + added_diagnostics)
+
+        # Fetch the other feeds together without holding up the setup
+        if unrestored:
+            self._entry.async_create_background_task(
+                self._hass,
+                async_refresh_feeds(unrestored),
+                f"{DOMAIN} refresh {len(unrestored)} feeds",
+            )
+
+    async def async_unload(self) -> None:
+        """Release the feeds of the unloaded sensors."""
+        self._sensors = {}
+        self._diagnostics = {}
+        for coordinator in self._coordinators:
+            await self._async_release(coordinator)
+        self._coordinators = set()
+
+    async def _async_release(self, coordinator: IceCreamFeedCoordinator) -> None:
+        """Release a feed, handing its diagnostic sensors to another entry."""
+        await async_release_feed_coordinator(
+            self._hass, coordinator, self._entry.entry_id
+        )
+        if coordinator.diagnostics_entry_id != self._entry.entry_id:
+            return
+        coordinator.diagnostics_entry_id = None
+        for sensors in self._hass.data[DOMAIN].values():
+            if (
+                isinstance(sensors, EntrySensors)
+                and sensors is not self
+                and coordinator in sensors.coordinators
+            ):
+                sensors.async_adopt_diagnostics(coordinator)
+                return
+
+    @callback
+    def async_adopt_diagnostics(self, coordinator: IceCreamFeedCoordinator) -> None:
+        """Show the diagnostic sensors of a feed released by another entry."""
+        coordinator.diagnostics_entry_id = self._entry.entry_id
+        diagnostics = self._feed_diagnostics(
+            get_entry_config(self._entry), coordinator
+        )
+        self._diagnostics.update(diagnostics)
+        self._async_add_entities(list(diagnostics.values()))
+
+    def _feed_diagnostics(
+        self, config, coordinator: IceCreamFeedCoordinator
+    ) -> dict[tuple[str, str], "FeedMetricSensor"]:
+        """Get the diagnostic sensors of a feed, creating them if needed."""
+        diagnostics = {}
+        for description in FEED_METRICS:
+            key = (coordinator.url, description.key)
+            diagnostics[key] = self._diagnostics.get(key) or FeedMetricSensor(
+                config, coordinator, description
+            )
+        return diagnostics
+
+
+@dataclass(frozen=True)
+class UpdateThresholds:
+    """How much the nearest vans must change before the state is written."""
+
+    distance: float = DEFAULT_DISTANCE_THRESHOLD  # km
+    position: float = DEFAULT_POSITION_THRESHOLD  # m
+    min_interval: float = DEFAULT_MIN_UPDATE_INTERVAL  # seconds
+
+
+def get_update_thresholds(config) -> UpdateThresholds:
+    """Get the configured update thresholds."""
+    return UpdateThresholds(
+        config.get(CONF_DISTANCE_THRESHOLD, DEFAULT_DISTANCE_THRESHOLD),
+        config.get(CONF_POSITION_THRESHOLD, DEFAULT_POSITION_THRESHOLD),
+        config.get(CONF_MIN_UPDATE_INTERVAL, DEFAULT_MIN_UPDATE_INTERVAL),
+    )
+
+
+def get_operating_hours(config) -> OperatingHours | None:
+    """Get the configured operating hours, if any."""
+    opening = config.get(CONF_OPENING_TIME)
+    closing = config.get(CONF_CLOSING_TIME)
+    if not opening or not closing:
+        return None
+    return OperatingHours(dt_util.parse_time(opening), dt_util.parse_time(closing))
+
+
+class IceCreamVanSensor(CoordinatorEntity, SensorEntity):
     """Sensor class for ice_cream_benelux."""
 
-    def __init__(self, config, company, user_lat, user_lon) -> None:
+    def __init__(
+        self,
+        config,
+        company,
+        user_lat,
+        user_lon,
+        coordinator: IceCreamFeedCoordinator,
+        provider: ProviderSpec,
+        location_name: str | None = None,
+    ) -> None:
         """Initialize the sensor."""
+        self._provider = provider
         self._name = f"{config.get(CONF_APP_NAME)} {company}"
+        if location_name:
+            self._name = f"{self._name} {location_name}"
         self._company = company
         self._state = None
         self._user_lat = user_lat
         self._user_lon = user_lon
-        self._attributes = {}
-        self._http = HTTPClient(logger=_LOGGER)
+        self._reference = ReferencePoint(user_lat, user_lon)
+        self._max_radius = config.get(CONF_MAX_RADIUS) or None
+        self._bounding_box = (
+            self._reference.bounding_box(self._max_radius)
+            if self._max_radius
+            else None
+        )
+        super().__init__(
+            coordinator,
+            FeedSubscription(
+                self._provider,
+                self._reference,
+                get_operating_hours(config),
+                self._bounding_box,
+            ),
+        )
+        self._nearest_count = config.get(CONF_NEAREST_COUNT, DEFAULT_NEAREST_COUNT)
+        self._nearest: list[tuple[float, Van]] = []
+        self._out_of_range = False
+        self.thresholds = get_update_thresholds(config)
+        self._written: tuple | None = None
+        self._written_at = 0.0
 
     @property
     def device_class(self):
@@ -71,10 +325,22 @@ class IceCreamVanSensor(SensorEntity):
         """Return the state of the sensor."""
         return self._state
 
+    @property
+    def available(self) -> bool:
+        """Return whether there is data, possibly stale, to show."""
+        return self.coordinator.data is not None
+
     @property
     def extra_state_attributes(self):
         """Return the state attributes."""
-        return self._attributes
+        last_updated_upstream = self.coordinator.last_updated_upstream
+        return {
+            **self.van_attributes(),
+            "last_updated_upstream": last_updated_upstream.isoformat()
+            if last_updated_upstream
+            else None,
+            "stale": self.coordinator.stale,
+        }
 
     # Unit of measurement
     @property
@@ -82,398 +348,242 @@ class IceCreamVanSensor(SensorEntity):
         """Return the unit of measurement."""
         return "km"
 
-    async def async_update(self):
-        """Update sensor."""
-        await self.set_van_state()
-
-    async def set_van_state(self):
-        """Get nearest van and set state."""
-        try:
-            van = await self.get_nearest_van()
-            if van is not None:
-                self._state = van["distance"]
-                self._attributes = van
-            # TODO: Make the "unknown" state configurable
-            # if van is None:
-            #     self._state = "unknown"
-            #     self._attributes = {}
-            # else:
-            #     self._state = van["distance"]
-            #     self._attributes = van
-
-        except Exception:  # pylint: disable=broad-except
-            _LOGGER.exception("Unexpected error: %s", self.entity_id)
-
-    async def get_nearest_van(self):
-        """Get the nearest van. To be implemented by subclasses."""
-        raise NotImplementedError
+    async def async_added_to_hass(self) -> None:
+        """Set the initial state from the shared feed."""
+        await super().async_added_to_hass()
+        self.update_from_feed()
 
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Handle a new payload from the shared feed.
 
-class DeKremkerreMelleSensor(IceCreamVanSensor):
-    """Sensor class for De Kremkerre Melle."""
+        The state is only written when it changed materially, see
+        `is_material_change`.
+        """
+        if self.update_from_feed():
+            super()._handle_coordinator_update()
 
-    async def get_vans(self):
-        """Get vans."""
-        return await self._http.request_with_retry("https://ijsjesradar.be/status.php")
-
-    async def get_nearest_van(self) -> dict | None:
-        """Get nearest van."""
-        vans = await self.get_vans()
-        vans = [
-            van
-            for van in vans
-            if van.get("company_ref") == "de-kremkerre"
-            and van.get("status") == "online"
-        ]
-        vans_with_distance = []
-        for van in vans:
-            lat = van.get("location", {}).get("lat")
-            lon = van.get("location", {}).get("lon")
-            if lat is None or lon is None:
-                continue
-            distance = haversine(lat, lon, self._user_lat, self._user_lon)
-            vans_with_distance.append(
-                {
-                    "company": self._company,
-                    "label": van.get("name"),
-                    "latitude": lat,
-                    "longitude": lon,
-                    "status": van.get("status"),
-                    "distance": round(distance, 2),
-                }
-            )
-        return min(vans_with_distance, key=lambda x: x["distance"], default=None)
-
-
-class DeKrijmboerLommelSensor(IceCreamVanSensor):
-    """Sensor class for De Krijmboer Lommel."""
-
-    async def get_vans(self):
-        """Get vans."""
-        return await self._http.request_with_retry(
-            "https://api.icecorp.be/v1/icecreamvanmarkerdata?company_id=10&has_working_day=1"
-        )
-
-    async def get_nearest_van(self) -> dict | None:
-        """Get nearest van."""
-        json_data = await self.get_vans()
-        vans = json_data.get("data", [])
-        vans_with_distance = []
-        for van in vans:
-            lat = van.get("latitude")
-            lon = van.get("longitude")
-            if lat is None or lon is None:
-                continue
-            distance = haversine(lat, lon, self._user_lat, self._user_lon)
-            vans_with_distance.append(
-                {
-                    "company": self._company,
-                    "label": van.get("title", ""),
-                    "latitude": lat,
-                    "longitude": lon,
-                    "status": van.get("status", "").lower(),
-                    "distance": round(distance, 2),
-                }
-            )
-        return min(vans_with_distance, key=lambda x: x["distance"], default=None)
-
-
-class FoubertSintNiklaasSensor(IceCreamVanSensor):
-    """Sensor class for Foubert Sint-Niklaas."""
-
-    async def get_vans(self):
-        """Get vans."""
-        return await self._http.request_with_retry(
-            "https://api.icecorp.be/v1/icecreamvanmarkerdata?company_id=2&has_working_day=1"
-        )
+    def update_from_feed(self) -> bool:
+        """Rank the vans of the shared feed and set state.
 
-    async def get_nearest_van(self) -> dict | None:
-        """Get nearest van."""
-        json_data = await self.get_vans()
-        vans = json_data.get("data", [])
-        vans_with_distance = []
-        for van in vans:
-            lat = van.get("latitude")
-            lon = van.get("longitude")
-            if lat is None or lon is None:
-                continue
-            distance = haversine(lat, lon, self._user_lat, self._user_lon)
-            vans_with_distance.append(
-                {
-                    "company": self._company,
-                    "label": van.get("title", ""),
-                    "latitude": lat,
-                    "longitude": lon,
-                    "status": van.get("status", "").lower(),
-                    "distance": round(distance, 2),
-                }
-            )
-        return min(vans_with_distance, key=lambda x: x["distance"], default=None)
-
-
-class GlaceDeBockBeverenSensor(IceCreamVanSensor):
-    """Sensor class for Glace De Bock Beveren."""
-
-    async def get_vans(self):
-        """Get vans."""
-        return await self._http.request_with_retry("https://ijsjesradar.be/status.php")
-
-    async def get_nearest_van(self) -> dict | None:
-        """Get nearest van."""
-        vans = await self.get_vans()
-        vans = [
-            van
-            for van in vans
-            if van.get("company_ref") == "de-bock" and van.get("status") == "online"
-        ]
-        vans_with_distance = []
-        for van in vans:
-            lat = van.get("location", {}).get("lat")
-            lon = van.get("location", {}).get("lon")
-            if lat is None or lon is None:
-                continue
-            distance = haversine(lat, lon, self._user_lat, self._user_lon)
-            vans_with_distance.append(
-                {
-                    "company": self._company,
-                    "label": van.get("name"),
-                    "latitude": lat,
-                    "longitude": lon,
-                    "status": van.get("status"),
-                    "distance": round(distance, 2),
-                }
-            )
-        return min(vans_with_distance, key=lambda x: x["distance"], default=None)
-
-
-class HetBoerenijsjeLoenhoutSensor(IceCreamVanSensor):
-    """Sensor class for Het Boerenijsje Loenhout."""
-
-    async def get_vans(self):
-        """Get vans."""
-        return await self._http.request_with_retry(
-            "https://api.icecorp.be/v1/icecreamvanmarkerdata?company_id=12&has_working_day=1"
-        )
-
-    async def get_nearest_van(self) -> dict | None:
-        """Get nearest van."""
-        json_data = await self.get_vans()
-        vans = json_data.get("data", [])
-        vans_with_distance = []
-        for van in vans:
-            lat = van.get("latitude")
-            lon = van.get("longitude")
-            if lat is None or lon is None:
-                continue
-            distance = haversine(lat, lon, self._user_lat, self._user_lon)
-            vans_with_distance.append(
-                {
-                    "company": self._company,
-                    "label": van.get("title", ""),
-                    "latitude": lat,
-                    "longitude": lon,
-                    "status": van.get("status", "").lower(),
-                    "distance": round(distance, 2),
-                }
-            )
-        return min(vans_with_distance, key=lambda x: x["distance"], default=None)
-
-
-class HetDroomijsjeBreskensSensor(IceCreamVanSensor):
-    """Sensor class for Het Droomijsje Breskens."""
-
-    async def get_vans(self):
-        """Get vans."""
-        return await self._http.request_with_retry("https://ijsjesradar.be/status.php")
-
-    async def get_nearest_van(self) -> dict | None:
-        """Get nearest van."""
-        vans = await self.get_vans()
-        vans = [
-            van
-            for van in vans
-            if van.get("company_ref") == "het-droomijsje"
-            and van.get("status") == "online"
-        ]
-        vans_with_distance = []
-        for van in vans:
-            lat = van.get("location", {}).get("lat")
-            lon = van.get("location", {}).get("lon")
-            if lat is None or lon is None:
-                continue
-            distance = haversine(lat, lon, self._user_lat, self._user_lon)
-            vans_with_distance.append(
-                {
-                    "company": self._company,
-                    "label": van.get("name"),
-                    "latitude": lat,
-                    "longitude": lon,
-                    "status": van.get("status"),
-                    "distance": round(distance, 2),
-                }
-            )
-        return min(vans_with_distance, key=lambda x: x["distance"], default=None)
-
-
-class JorisBeerseSensor(IceCreamVanSensor):
-    """Sensor class for Joris Beerse."""
-
-    async def get_vans(self):
-        """Get vans."""
-        return await self._http.request_with_retry(
-            "https://api.icecorp.be/v1/icecreamvanmarkerdata?company_id=4&has_working_day=1"
-        )
-
-    async def get_nearest_van(self) -> dict | None:
-        """Get nearest van."""
-        json_data = await self.get_vans()
-        vans = json_data.get("data", [])
-        vans_with_distance = []
-        for van in vans:
-            lat = van.get("latitude")
-            lon = van.get("longitude")
-            if lat is None or lon is None:
-                continue
-            distance = haversine(lat, lon, self._user_lat, self._user_lon)
-            vans_with_distance.append(
-                {
-                    "company": self._company,
-                    "label": van.get("title", ""),
-                    "latitude": lat,
-                    "longitude": lon,
-                    "status": van.get("status", "").lower(),
-                    "distance": round(distance, 2),
-                }
+        Returns whether the state changed materially.
+        """
+        try:
+            ranked = self.coordinator.distances_for(self.coordinator_context)
+            if ranked is None:
+                return False
+            nearest_vans = self.rank_vans(*ranked)
+            stale = self.coordinator.stale
+            if not self.is_material_change(nearest_vans, stale):
+                return False
+            self.set_van_state(nearest_vans)
+            self._written = (nearest_vans, stale)
+            self._written_at = monotonic()
+        except Exception:  # pylint: disable=broad-except
+            _LOGGER.exception("Unexpected error: %s", self.entity_id)
+            return False
+        return True
+
+    def is_material_change(
+        self, nearest_vans: list[tuple[float, Van]], stale: bool
+    ) -> bool:
+        """Return whether the nearest vans differ enough from the written state.
+
+        A different set of nearest vans or a change in staleness always is.
+        Movement only is once a van moved at least the position threshold or
+        its distance changed at least the distance threshold, and the minimum
+        interval since the last write has passed.
+        """
+        if self._written is None:
+            return True
+        written_vans, written_stale = self._written
+        if stale != written_stale or [van.label for _, van in nearest_vans] != [
+            van.label for _, van in written_vans
+        ]:
+            return True
+        if monotonic() - self._written_at < self.thresholds.min_interval:
+            return False
+        return any(
+            abs(distance - written_distance) >= self.thresholds.distance
+            or haversine(
+                written_van.latitude,
+                written_van.longitude,
+                van.latitude,
+                van.longitude,
             )
-        return min(vans_with_distance, key=lambda x: x["distance"], default=None)
-
-
-class PitzStekeneSensor(IceCreamVanSensor):
-    """Sensor class for Pitz Stekene."""
-
-    async def get_vans(self):
-        """Get vans."""
-        return await self._http.request_with_retry(
-            "https://map-pitz-ijs.vercel.app/api/?purge=false"
-        )
-
-    async def get_nearest_van(self) -> dict | None:
-        """Get nearest van."""
-        vans = await self.get_vans()
-        vans = [van for van in vans if van.get("active")]
-        vans_with_distance = []
-        for van in vans:
-            lat = van.get("lat")
-            lng = van.get("lng")
-            if lat is None or lng is None:
-                continue
-            distance = haversine(van["lat"], van["lng"], self._user_lat, self._user_lon)
-            vans_with_distance.append(
-                {
-                    "company": self._company,
-                    "label": van.get("naam"),
-                    "latitude": lat,
-                    "longitude": lng,
-                    "status": "active" if van.get("active") else "inactive",
-                    "distance": round(distance, 2),
-                }
+            * 1000
+            >= self.thresholds.position
+            for (distance, van), (written_distance, written_van) in zip(
+                nearest_vans, written_vans
             )
-        return min(vans_with_distance, key=lambda x: x["distance"], default=None)
-
-
-class TartisteDeinzeSensor(IceCreamVanSensor):
-    """Sensor class for Tartiste Deinze."""
-
-    async def get_vans(self):
-        """Get vans."""
-        return await self._http.request_with_retry(
-            "https://api.icecorp.be/v1/icecreamvanmarkerdata?company_id=8&has_working_day=1"
         )
 
-    async def get_nearest_van(self) -> dict | None:
-        """Get nearest van."""
-        json_data = await self.get_vans()
-        vans = json_data.get("data", [])
-        vans_with_distance = []
-        for van in vans:
-            lat = van.get("latitude")
-            lon = van.get("longitude")
-            if lat is None or lon is None:
-                continue
-            distance = haversine(lat, lon, self._user_lat, self._user_lon)
-            vans_with_distance.append(
-                {
-                    "company": self._company,
-                    "label": van.get("title", ""),
-                    "latitude": lat,
-                    "longitude": lon,
-                    "status": van.get("status", "").lower(),
-                    "distance": round(distance, 2),
-                }
-            )
-        return min(vans_with_distance, key=lambda x: x["distance"], default=None)
-
-
-class VanDeWalleTemseSensor(IceCreamVanSensor):
-    """Sensor class for Van De Walle Temse."""
-
-    async def get_vans(self):
-        """Get vans."""
-        return await self._http.request_with_retry(
-            "https://www.ijsvandewalle.be/map/result.json"
-        )
+    def set_van_state(self, nearest_vans: list[tuple[float, Van]]):
+        """Set state from the nearest vans."""
+        if nearest_vans:
+            self._state = nearest_vans[0][0]
+            self._nearest = nearest_vans
+            self._out_of_range = False
+        elif self._max_radius:
+            self._state = None
+            self._nearest = []
+            self._out_of_range = True
+
+    def van_attributes(self) -> dict:
+        """Get the attributes of the nearest vans."""
+        if self._nearest:
+            distance, van = self._nearest[0]
+            return {
+                **self.van_dict(distance, van),
+                **self.van_motion(van),
+                "nearest_vans": [
+                    self.van_dict(distance, van) for distance, van in self._nearest
+                ],
+            }
+        if self._out_of_range:
+            return {
+                "company": self._company,
+                "status": STATUS_OUT_OF_RANGE,
+            }
+        return {}
+
+    def van_dict(self, distance: float, van: Van) -> dict:
+        """Get a ranked van as a dict."""
+        return {"company": self._company, **van.as_dict(), "distance": distance}
+
+    def van_motion(self, van: Van) -> dict:
+        """Get the speed, heading, approach rate and ETA of a van."""
+        history = self.coordinator.position_history(self._provider, van.label)
+        motion = history.motion(self._reference) if history else None
+        return motion or {
+            "speed": None,
+            "heading": None,
+            "approach_rate": None,
+            "eta": None,
+        }
+
+    def rank_vans(
+        self, vans: list[Van], distances: list[float]
+    ) -> list[tuple[float, Van]]:
+        """Rank vans by their distances and keep the nearest."""
+        nearest = nearest_indices(distances, self._nearest_count, self._max_radius)
+        return [(round(distance, 2), vans[index]) for distance, index in nearest]
+
+
+@dataclass(frozen=True, kw_only=True)
+class FeedMetricDescription(SensorEntityDescription):
+    """Description of a diagnostic sensor showing a feed metric."""
+
+    value_fn: Callable[[FeedMetrics], float | int | None]
+    attributes_fn: Callable[[FeedMetrics], dict] | None = None
+
+
+FEED_METRICS = (
+    FeedMetricDescription(
+        key="request_latency",
+        name="request latency",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda metrics: milliseconds(metrics.latency.last),
+        attributes_fn=lambda metrics: metrics.latency.as_dict(),
+    ),
+    FeedMetricDescription(
+        key="retries",
+        name="retries",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda metrics: metrics.retries,
+        attributes_fn=lambda metrics: {"failures": metrics.failures},
+    ),
+    FeedMetricDescription(
+        key="feed_size",
+        name="feed size",
+        device_class=SensorDeviceClass.DATA_SIZE,
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda metrics: metrics.last_size,
+        attributes_fn=lambda metrics: {"bytes_received": metrics.bytes_received},
+    ),
+    FeedMetricDescription(
+        key="parse_time",
+        name="parse time",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda metrics: milliseconds(metrics.parse_time.last),
+        attributes_fn=lambda metrics: metrics.parse_time.as_dict(),
+    ),
+    FeedMetricDescription(
+        key="rank_time",
+        name="rank time",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda metrics: milliseconds(metrics.rank_time.last),
+        attributes_fn=lambda metrics: metrics.rank_time.as_dict(),
+    ),
+    FeedMetricDescription(
+        key="cache_hit_ratio",
+        name="cache hit ratio",
+        native_unit_of_measurement=PERCENTAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda metrics: None
+        if metrics.cache_hit_ratio is None
+        else round(metrics.cache_hit_ratio * 100, 1),
+        attributes_fn=lambda metrics: {
+            "requests": metrics.latency.count,
+            "not_modified": metrics.not_modified,
+        },
+    ),
+)
+
+
+class FeedMetricSensor(SensorEntity):
+    """Diagnostic sensor showing a metric of a feed.
+
+    The metrics change with every request, also when the feed is not
+    modified, so the sensor is polled rather than updated by the feed. The
+    sensors are disabled by default, to keep them out of the recorder unless
+    asked for.
+    """
+
+    entity_description: FeedMetricDescription
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_should_poll = True
+
+    def __init__(
+        self,
+        config,
+        coordinator: IceCreamFeedCoordinator,
+        description: FeedMetricDescription,
+    ) -> None:
+        """Initialize the sensor."""
+        self.entity_description = description
+        self.coordinator = coordinator
+        host = urlsplit(coordinator.url).hostname
+        self._name = f"{config.get(CONF_APP_NAME)} {host} {description.name}"
+        self._unique_id = f"{APP_NAME}_{host}_{description.key}"
 
-    async def get_nearest_van(self) -> dict | None:
-        """Get nearest van."""
-        vans = await self.get_vans()
-        vans_with_distance = []
-        for van in vans:
-            lat = van.get("latitude")
-            lon = van.get("longitude")
-            if lat is None or lon is None:
-                continue
-            distance = haversine(lat, lon, self._user_lat, self._user_lon)
-            vans_with_distance.append(
-                {
-                    "company": self._company,
-                    "label": van.get("label", ""),
-                    "latitude": lat,
-                    "longitude": lon,
-                    "status": van.get("status"),
-                    "distance": round(distance, 2),
-                }
-            )
-        return min(vans_with_distance, key=lambda x: x["distance"], default=None)
+    @property
+    def name(self):
+        """Return the name of the sensor."""
+        return self._name
 
+    @property
+    def unique_id(self):
+        """Return the unique id of the sensor."""
+        return self._unique_id
 
-class VanillaPlusOostendeSensor(IceCreamVanSensor):
-    """Sensor class for Vanilla Plus."""
+    @property
+    def native_value(self):
+        """Return the metric."""
+        return self.entity_description.value_fn(self.coordinator.metrics)
 
-    async def get_vans(self):
-        """Get vans."""
-        return await self._http.request_with_retry(
-            "https://api.icecorp.be/v1/icecreamvanmarkerdata?company_id=11&has_working_day=1"
-        )
+    @property
+    def extra_state_attributes(self):
+        """Return the details of the metric."""
+        if self.entity_description.attributes_fn is None:
+            return None
+        return self.entity_description.attributes_fn(self.coordinator.metrics)
 
-    async def get_nearest_van(self) -> dict | None:
-        """Get nearest van."""
-        json_data = await self.get_vans()
-        vans = json_data.get("data", [])
-        vans_with_distance = []
-        for van in vans:
-            lat = van.get("latitude")
-            lon = van.get("longitude")
-            if lat is None or lon is None:
-                continue
-            distance = haversine(lat, lon, self._user_lat, self._user_lon)
-            vans_with_distance.append(
-                {
-                    "company": self._company,
-                    "label": van.get("title", ""),
-                    "latitude": lat,
-                    "longitude": lon,
-                    "status": van.get("status", "").lower(),
-                    "distance": round(distance, 2),
-                }
-            )
-        return min(vans_with_distance, key=lambda x: x["distance"], default=None)
@@ -0,0 +1,51 @@
+"""Feed snapshots for ice_cream_benelux."""
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DATA_SNAPSHOTS, DOMAIN, SNAPSHOT_SAVE_DELAY
+
+STORAGE_KEY = f"{DOMAIN}.snapshots"
+STORAGE_VERSION = 1
+
+
+class FeedSnapshots:
+    """Last normalized vans of every feed, kept on disk across restarts.
+
+    Snapshots are stored per feed URL as the normalized vans per company and
+    the time they were fetched. Writes are delayed and coalesced, so frequent
+    polling does not mean frequent disk writes.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the snapshots."""
+        self._store: Store[dict[str, dict]] = Store(
+            hass, STORAGE_VERSION, STORAGE_KEY
+        )
+        self._snapshots: dict[str, dict] = {}
+        self._loaded = False
+
+    async def async_load(self) -> None:
+        """Load the snapshots from disk, once."""
+        if self._loaded:
+            return
+        self._snapshots = await self._store.async_load() or {}
+        self._loaded = True
+
+    def get(self, url: str) -> dict | None:
+        """Return the snapshot of a feed."""
+        return self._snapshots.get(url)
+
+    @callback
+    def async_save(self, url: str, snapshot: dict) -> None:
+        """Replace the snapshot of a feed and schedule writing it to disk."""
+        self._snapshots[url] = snapshot
+        self._store.async_delay_save(lambda: self._snapshots, SNAPSHOT_SAVE_DELAY)
+
+
+def get_feed_snapshots(hass: HomeAssistant) -> FeedSnapshots:
+    """Get the feed snapshots shared by all feeds of the integration."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if DATA_SNAPSHOTS not in domain_data:
+        domain_data[DATA_SNAPSHOTS] = FeedSnapshots(hass)
+    return domain_data[DATA_SNAPSHOTS]
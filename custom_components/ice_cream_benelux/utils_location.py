@@ -1,11 +1,35 @@
 """Location utilities for ice_cream_benelux."""
 
+from collections.abc import Iterable, Sequence
+import heapq
 import math
 
+from homeassistant.const import CONF_NAME
+
+from .const import CONF_LATITUDE, CONF_LOCATIONS, CONF_LONGITUDE
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+R = 6371  # Radius of Earth in kilometers
+KM_PER_DEGREE = R * math.pi / 180
+
+
+def get_locations(config) -> list[tuple[str | None, float, float]]:
+    """Get the (name, latitude, longitude) of every configured location.
+
+    The main location comes first and has no name.
+    """
+    return [(None, config.get(CONF_LATITUDE), config.get(CONF_LONGITUDE))] + [
+        (location[CONF_NAME], location[CONF_LATITUDE], location[CONF_LONGITUDE])
+        for location in config.get(CONF_LOCATIONS, [])
+    ]
+
 
 def haversine(lat1, lon1, lat2, lon2):
     """Calculate the great circle distance in kilometers between two points on the earth."""
-    R = 6371  # Radius of Earth in kilometers
     dLat = math.radians(lat2 - lat1)
     dLon = math.radians(lon2 - lon1)
     a = (
@@ -16,3 +40,111 @@ def haversine(lat1, lon1, lat2, lon2):
     )
     c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
     return R * c
+
+
+class ReferencePoint:
+    """A fixed location with its trigonometry computed once."""
+
+    __slots__ = ("latitude", "longitude", "lat_rad", "lon_rad", "cos_lat")
+
+    def __init__(self, latitude: float, longitude: float) -> None:
+        """Initialize the reference point."""
+        self.latitude = latitude
+        self.longitude = longitude
+        self.lat_rad = math.radians(latitude)
+        self.lon_rad = math.radians(longitude)
+        self.cos_lat = math.cos(self.lat_rad)
+
+    def __repr__(self) -> str:
+        """Return the representation of the reference point."""
+        return f"ReferencePoint({self.latitude}, {self.longitude})"
+
+    def distance(self, lat: float, lon: float) -> float:
+        """Calculate the great circle distance in kilometers to a location."""
+        lat_rad = math.radians(lat)
+        a = (
+            math.sin((lat_rad - self.lat_rad) / 2) ** 2
+            + self.cos_lat
+            * math.cos(lat_rad)
+            * math.sin((math.radians(lon) - self.lon_rad) / 2) ** 2
+        )
+        return 2 * R * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+    def bounding_box(self, radius: float) -> tuple[float, float, float, float]:
+        """Return (min_lat, max_lat, min_lon, max_lon) enclosing a radius in km."""
+        lat_delta = radius / KM_PER_DEGREE
+        max_abs_lat = min(abs(self.latitude) + lat_delta, 89.0)
+        lon_delta = min(
+            radius / (KM_PER_DEGREE * math.cos(math.radians(max_abs_lat))), 180.0
+        )
+        return (
+            self.latitude - lat_delta,
+            self.latitude + lat_delta,
+            self.longitude - lon_delta,
+            self.longitude + lon_delta,
+        )
+
+
+def haversine_matrix(
+    coordinates: Sequence[tuple[float, float]],
+    points: Sequence[ReferencePoint],
+) -> list[list[float]]:
+    """Calculate the distances in kilometers from many points to many coordinates.
+
+    Returns one row per reference point with the distance to every coordinate,
+    computed in one vectorized operation when NumPy is available.
+    """
+    if not coordinates or not points:
+        return [[] for _ in points]
+    if np is not None:
+        return _haversine_matrix_numpy(coordinates, points)
+    return _haversine_matrix_python(coordinates, points)
+
+
+def _haversine_matrix_numpy(coordinates, points) -> list[list[float]]:
+    """Calculate the distance matrix with NumPy."""
+    lat1, lon1 = np.array(
+        [(point.lat_rad, point.lon_rad) for point in points], dtype=float
+    ).T[:, :, None]
+    cos_lat1 = np.array([point.cos_lat for point in points], dtype=float)[:, None]
+    lat2, lon2 = np.radians(np.asarray(coordinates, dtype=float)).T[:, None, :]
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + cos_lat1 * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    return (R * c).tolist()
+
+
+def _haversine_matrix_python(coordinates, points) -> list[list[float]]:
+    """Calculate the distance matrix with the trigonometry computed once per van."""
+    vans = [ReferencePoint(lat, lon) for lat, lon in coordinates]
+    matrix = []
+    for point in points:
+        row = []
+        for van in vans:
+            a = (
+                math.sin((van.lat_rad - point.lat_rad) / 2) ** 2
+                + point.cos_lat
+                * van.cos_lat
+                * math.sin((van.lon_rad - point.lon_rad) / 2) ** 2
+            )
+            row.append(2 * R * math.atan2(math.sqrt(a), math.sqrt(1 - a)))
+        matrix.append(row)
+    return matrix
+
+
+def nearest_indices(
+    distances: Iterable[float], k: int, max_distance: float | None = None
+) -> list[tuple[float, int]]:
+    """Select the k smallest distances as (distance, index) pairs.
+
+    Runs as a streaming heap selection, so only the winners are kept. Ties are
+    broken by index, and distances above `max_distance` are skipped.
+    """
+    candidates = (
+        (distance, index)
+        for index, distance in enumerate(distances)
+        if max_distance is None or distance <= max_distance
+    )
+    return heapq.nsmallest(k, candidates)
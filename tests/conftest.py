@@ -0,0 +1,12 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from custom_components.ice_cream_benelux import coordinator
+
+
+@pytest.fixture
+def hass(monkeypatch):
+    """Return a bare hass whose HTTP client only opens a session on request."""
+    monkeypatch.setattr(coordinator, "async_get_clientsession", lambda hass: None)
+    return MagicMock(data={})
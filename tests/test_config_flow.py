@@ -0,0 +1,173 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from homeassistant.const import CONF_NAME
+from homeassistant.data_entry_flow import AbortFlow
+import pytest
+
+from custom_components.ice_cream_benelux.config_flow import ConfigFlow, OptionsFlow
+from custom_components.ice_cream_benelux.const import (
+    CONF_ADD_LOCATION,
+    CONF_COMPANIES,
+    CONF_LATITUDE,
+    CONF_LOCATIONS,
+    CONF_LONGITUDE,
+    DOMAIN,
+)
+
+DATA = {
+    CONF_LATITUDE: 51.0,
+    CONF_LONGITUDE: 4.0,
+    CONF_COMPANIES: ["pitz_stekene"],
+    CONF_LOCATIONS: [],
+}
+
+
+def config_flow(existing=None):
+    flow = ConfigFlow()
+    flow.hass = MagicMock()
+    flow.hass.config_entries.async_entry_for_domain_unique_id.return_value = existing
+    flow.handler = DOMAIN
+    flow.context = {"source": "user"}
+    return flow
+
+
+@pytest.mark.asyncio
+async def test_user_flow_sets_unique_id():
+    flow = config_flow()
+
+    result = await flow.async_step_user(dict(DATA))
+
+    assert result["type"] == "create_entry"
+    assert result["data"] == DATA
+    assert flow.unique_id == "51.0_4.0_pitz_stekene"
+
+
+@pytest.mark.asyncio
+async def test_user_flow_matching_an_entry_is_aborted():
+    flow = config_flow(SimpleNamespace(entry_id="entry", source="user", data=DATA))
+
+    with pytest.raises(AbortFlow) as aborted:
+        await flow.async_step_user(dict(DATA))
+
+    assert aborted.value.reason == "already_configured"
+    flow.hass.config_entries.async_entry_for_domain_unique_id.assert_called_with(
+        DOMAIN, "51.0_4.0_pitz_stekene"
+    )
+
+
+OFFICE = {CONF_NAME: "Office", CONF_LATITUDE: 51.05, CONF_LONGITUDE: 3.72}
+
+
+@pytest.mark.asyncio
+async def test_user_flow_adds_named_locations():
+    flow = config_flow()
+
+    result = await flow.async_step_user({**DATA, CONF_ADD_LOCATION: True})
+    assert result["type"] == "form"
+    assert result["step_id"] == "location"
+
+    result = await flow.async_step_location({**OFFICE, CONF_ADD_LOCATION: True})
+    assert result["step_id"] == "location"
+    result = await flow.async_step_location(
+        {CONF_NAME: "School", CONF_LATITUDE: 51.1, CONF_LONGITUDE: 4.1}
+    )
+
+    assert result["type"] == "create_entry"
+    assert [location[CONF_NAME] for location in result["data"][CONF_LOCATIONS]] == [
+        "Office",
+        "School",
+    ]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("location", "errors"),
+    [
+        ({**OFFICE, CONF_LATITUDE: 51.1}, {CONF_NAME: "duplicate_name"}),
+        ({**OFFICE, CONF_NAME: "Home"}, {"base": "duplicate_location"}),
+        (
+            {CONF_NAME: "Home", CONF_LATITUDE: 51.0, CONF_LONGITUDE: 4.0},
+            {"base": "duplicate_location"},
+        ),
+    ],
+)
+async def test_user_flow_refuses_duplicate_locations(location, errors):
+    flow = config_flow()
+    await flow.async_step_user({**DATA, CONF_ADD_LOCATION: True})
+    await flow.async_step_location({**OFFICE, CONF_ADD_LOCATION: True})
+
+    result = await flow.async_step_location(location)
+
+    assert result["type"] == "form"
+    assert result["errors"] == errors
+    assert flow._data[CONF_LOCATIONS] == [OFFICE]
+
+
+def options_flow(other_unique_ids=()):
+    entry = SimpleNamespace(
+        entry_id="entry", unique_id="51.0_4.0_pitz_stekene", data=DATA, options={}
+    )
+    flow = OptionsFlow(entry)
+    flow.hass = MagicMock()
+    flow.hass.config_entries.async_entries.return_value = [
+        entry,
+        *(
+            SimpleNamespace(entry_id=unique_id, unique_id=unique_id)
+            for unique_id in other_unique_ids
+        ),
+    ]
+    return flow, entry
+
+
+@pytest.mark.asyncio
+async def test_options_update_unique_id():
+    flow, entry = options_flow()
+
+    result = await flow.async_step_init(
+        {
+            **DATA,
+            CONF_LATITUDE: 52.0,
+            CONF_COMPANIES: ["pitz_stekene", "joris_beerse"],
+        }
+    )
+
+    assert result["type"] == "create_entry"
+    flow.hass.config_entries.async_update_entry.assert_called_once_with(
+        entry, unique_id="52.0_4.0_pitz_stekene-joris_beerse", options=result["data"]
+    )
+
+
+@pytest.mark.asyncio
+async def test_options_matching_another_entry_are_refused():
+    flow, _ = options_flow(["51.0_4.0_joris_beerse"])
+
+    result = await flow.async_step_init({**DATA, CONF_COMPANIES: ["joris_beerse"]})
+
+    assert result["errors"] == {"base": "already_configured"}
+    flow.hass.config_entries.async_update_entry.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_options_refuse_duplicate_locations():
+    flow, entry = options_flow()
+    entry.data = {**DATA, CONF_LOCATIONS: [OFFICE]}
+
+    result = await flow.async_step_init(
+        {**DATA, CONF_LOCATIONS: ["Office"], CONF_ADD_LOCATION: True}
+    )
+    assert result["step_id"] == "location"
+    result = await flow.async_step_location({**OFFICE, CONF_NAME: "Work"})
+    assert result["errors"] == {"base": "duplicate_location"}
+
+    # The main location is moved to the office
+    result = await flow.async_step_init(
+        {
+            **DATA,
+            CONF_LATITUDE: 51.05,
+            CONF_LONGITUDE: 3.72,
+            CONF_LOCATIONS: ["Office"],
+        }
+    )
+    assert result["errors"] == {"base": "duplicate_location"}
+    flow.hass.config_entries.async_update_entry.assert_not_called()
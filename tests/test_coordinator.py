@@ -0,0 +1,290 @@
+from datetime import timedelta
+from unittest.mock import MagicMock
+
+from homeassistant.helpers.update_coordinator import UpdateFailed
+import pytest
+
+from custom_components.ice_cream_benelux.const import (
+    CONF_READ_TIMEOUT,
+    CONF_TOTAL_TIMEOUT,
+    DEFAULT_CONNECT_TIMEOUT,
+)
+from custom_components.ice_cream_benelux.coordinator import (
+    FeedSubscription,
+    IceCreamFeedCoordinator,
+    IcecorpCoordinator,
+    get_timeouts,
+)
+from custom_components.ice_cream_benelux.providers import (
+    ICECORP_COMPANY_URL,
+    ICECORP_URL,
+    IJSJESRADAR_URL,
+    PROVIDERS,
+    RequestTimeouts,
+    Van,
+)
+from custom_components.ice_cream_benelux.utils_location import ReferencePoint
+
+
+def test_timeouts_default_to_provider():
+    assert get_timeouts(PROVIDERS["joris_beerse"], {}) == RequestTimeouts()
+    assert get_timeouts(PROVIDERS["pitz_stekene"], {}).total == 20.0
+
+
+def test_timeouts_overridden_by_options():
+    timeouts = get_timeouts(
+        PROVIDERS["pitz_stekene"], {CONF_READ_TIMEOUT: 4.0, CONF_TOTAL_TIMEOUT: None}
+    )
+    assert timeouts == RequestTimeouts(
+        connect=DEFAULT_CONNECT_TIMEOUT, read=4.0, total=20.0
+    )
+
+
+class FakeHTTPClient:
+    def __init__(self, responses, status=200):
+        self.responses = responses
+        self.status = status
+        self.urls = []
+
+    async def request_with_retry(self, url, **kwargs):
+        self.urls.append(url)
+        return self.responses.pop(0)
+
+    def last_status(self, url):
+        return self.status
+
+
+@pytest.mark.asyncio
+async def test_failed_fetch_keeps_last_payload():
+    payload = [{"name": "Van #1", "location": {"lat": 51.0, "lon": 4.0}}]
+    coordinator = IceCreamFeedCoordinator(
+        MagicMock(), IJSJESRADAR_URL, FakeHTTPClient([payload, {}])
+    )
+    coordinator.data = await coordinator._async_update_data()
+    updated = coordinator.last_updated_upstream
+
+    with pytest.raises(UpdateFailed):
+        await coordinator._async_update_data()
+    coordinator.last_update_success = False
+
+    assert coordinator.data is payload
+    assert coordinator.stale
+    assert coordinator.last_updated_upstream == updated
+
+
+def test_restored_snapshot_is_served_until_first_fetch():
+    provider = PROVIDERS["glace_de_bock_beveren"]
+    van = {
+        "label": "Glacé De Bock #1",
+        "latitude": 51.1784796,
+        "longitude": 4.2148736,
+        "status": "online",
+    }
+    coordinator = IceCreamFeedCoordinator(MagicMock(), IJSJESRADAR_URL, None)
+    restored = coordinator.async_restore(
+        {
+            "last_updated_upstream": "2024-06-01T12:00:00+00:00",
+            "vans": {"glace_de_bock_beveren": [van]},
+        },
+        timedelta(seconds=5),
+    )
+
+    reference = ReferencePoint(51.1784796, 4.2148736)
+    vans, distances = coordinator.distances_for(FeedSubscription(provider, reference))
+    assert restored
+    assert vans == [Van(**van)]
+    assert distances == [0.0]
+    assert coordinator.stale
+    assert coordinator.update_interval == timedelta(seconds=5)
+
+
+def test_distances_for_skips_vans_outside_every_bounding_box():
+    provider = PROVIDERS["glace_de_bock_beveren"]
+    coordinator = IceCreamFeedCoordinator(MagicMock(), IJSJESRADAR_URL, None)
+    coordinator.data = [
+        {
+            "company_ref": "de-bock",
+            "name": name,
+            "status": "online",
+            "location": {"lat": lat, "lon": lon},
+        }
+        for name, lat, lon in (
+            ("Home", 51.17, 4.21),
+            ("Office", 51.05, 3.72),
+            ("Far away", 50.85, 5.69),
+        )
+    ]
+    subscriptions = [
+        FeedSubscription(provider, reference, bounding_box=reference.bounding_box(5))
+        for reference in (ReferencePoint(51.18, 4.22), ReferencePoint(51.05, 3.73))
+    ]
+    for subscription in subscriptions:
+        coordinator.async_add_listener(lambda: None, subscription)
+
+    vans, distances = coordinator.distances_for(subscriptions[0])
+
+    assert [van.label for van in vans] == ["Home", "Office"]
+    assert [round(distance, 1) for distance in distances] == [1.3, 37.8]
+
+
+def icecorp_coordinator(http):
+    coordinator = IcecorpCoordinator(MagicMock(), ICECORP_URL, http)
+    coordinator.add_company(4)
+    coordinator.add_company(8)
+    return coordinator
+
+
+@pytest.mark.asyncio
+async def test_icecorp_feed_is_partitioned_by_company():
+    joris = {"company_id": 4, "name": "Joris"}
+    tartiste = {"company_id": "8", "name": "Tartiste"}
+    payload = {"data": [joris, tartiste, {"company_id": 2, "name": "Other"}]}
+    http = FakeHTTPClient([payload, payload])
+    coordinator = icecorp_coordinator(http)
+
+    coordinator.data = await coordinator._async_fetch()
+    # The client hands out the cached payload itself when not modified
+    unchanged = await coordinator._async_fetch()
+
+    assert coordinator.data == {4: [joris], 8: [tartiste]}
+    assert unchanged is coordinator.data
+    assert coordinator.payload_for(8) == {"data": [tartiste]}
+    assert http.urls == [ICECORP_URL, ICECORP_URL]
+
+
+@pytest.mark.asyncio
+async def test_icecorp_cached_feed_is_partitioned_for_added_company():
+    joris = {"company_id": 4, "name": "Joris"}
+    other = {"company_id": 2, "name": "Other"}
+    payload = {"data": [joris, other]}
+    coordinator = icecorp_coordinator(FakeHTTPClient([payload, payload]))
+    coordinator.data = await coordinator._async_fetch()
+
+    # A new entry adds a company, then the feed is not modified
+    coordinator.add_company(2)
+    coordinator.data = await coordinator._async_fetch()
+
+    assert coordinator.data == {2: [other], 4: [joris], 8: []}
+    assert coordinator.payload_for(2) == {"data": [other]}
+
+
+@pytest.mark.asyncio
+async def test_icecorp_falls_back_to_per_company_requests_when_rejected():
+    joris = {"name": "Joris"}
+    tartiste = {"name": "Tartiste"}
+    http = FakeHTTPClient(
+        [
+            {"data": [joris]},
+            {"data": [joris]},
+            {"data": [tartiste]},
+            {"data": [joris]},
+            {"data": [tartiste]},
+        ]
+    )
+    coordinator = icecorp_coordinator(http)
+
+    first = await coordinator._async_fetch()
+    second = await coordinator._async_fetch()
+
+    assert first == second == {4: [joris], 8: [tartiste]}
+    company_urls = [
+        ICECORP_COMPANY_URL.format(company_id=4),
+        ICECORP_COMPANY_URL.format(company_id=8),
+    ]
+    assert http.urls == [ICECORP_URL, *company_urls, *company_urls]
+
+
+@pytest.mark.asyncio
+async def test_icecorp_falls_back_on_client_error():
+    http = FakeHTTPClient([{}, {"data": []}, {"data": []}], status=400)
+    coordinator = icecorp_coordinator(http)
+
+    assert await coordinator._async_fetch() == {4: [], 8: []}
+    assert len(http.urls) == 3
+
+
+@pytest.mark.asyncio
+async def test_icecorp_outage_does_not_fan_out():
+    http = FakeHTTPClient([{}, {}], status=None)
+    coordinator = icecorp_coordinator(http)
+
+    with pytest.raises(UpdateFailed):
+        await coordinator._async_fetch()
+    http.status = 503
+    with pytest.raises(UpdateFailed):
+        await coordinator._async_fetch()
+
+    assert http.urls == [ICECORP_URL, ICECORP_URL]
+
+
+def test_icecorp_only_fetches_companies_of_listening_sensors():
+    coordinator = icecorp_coordinator(FakeHTTPClient([]))
+    reference = ReferencePoint(51.0, 4.0)
+    unsubscribe = coordinator.async_add_listener(
+        lambda: None, FeedSubscription(PROVIDERS["joris_beerse"], reference)
+    )
+    coordinator.async_add_listener(
+        lambda: None, FeedSubscription(PROVIDERS["tartiste_deinze"], reference)
+    )
+    assert coordinator.company_ids == {4, 8}
+
+    # joris_beerse is removed from the options
+    unsubscribe()
+
+    assert coordinator.company_ids == {8}
+
+
+def van_at(lat):
+    return {
+        "company_ref": "de-bock",
+        "name": "Glacé De Bock #1",
+        "status": "online",
+        "location": {"lat": lat, "lon": 4.22},
+    }
+
+
+@pytest.mark.asyncio
+async def test_poll_interval_follows_the_distances_of_the_sensors():
+    reference = ReferencePoint(51.18, 4.22)
+    subscription = FeedSubscription(PROVIDERS["glace_de_bock_beveren"], reference)
+    coordinator = IceCreamFeedCoordinator(
+        MagicMock(),
+        IJSJESRADAR_URL,
+        FakeHTTPClient([[van_at(51.36)], [van_at(51.22)]]),
+    )
+    coordinator.async_add_listener(lambda: None, subscription)
+
+    coordinator.data = await coordinator._async_update_data()
+    # Far away and not moving yet, so polling backs off
+    assert coordinator.update_interval == timedelta(seconds=60)
+
+    coordinator.data = await coordinator._async_update_data()
+    assert coordinator.update_interval == timedelta(seconds=10)
+
+    # The sensors read the distances computed while planning the poll
+    _, distances = coordinator.distances_for(subscription)
+    assert [round(distance, 1) for distance in distances] == [4.4]
+    assert coordinator.metrics.rank_time.count == 2
+
+
+@pytest.mark.asyncio
+async def test_vans_that_cannot_be_told_apart_get_no_history():
+    provider = PROVIDERS["glace_de_bock_beveren"]
+    payload = [
+        {**van_at(51.2), "name": "Glacé De Bock #1"},
+        {**van_at(51.3), "name": "Glacé De Bock #2"},
+        {**van_at(51.4), "name": "Glacé De Bock #2"},
+        {**van_at(51.5), "name": ""},
+    ]
+    coordinator = IceCreamFeedCoordinator(
+        MagicMock(), IJSJESRADAR_URL, FakeHTTPClient([payload])
+    )
+    coordinator.async_add_listener(
+        lambda: None, FeedSubscription(provider, ReferencePoint(51.18, 4.22))
+    )
+
+    coordinator.data = await coordinator._async_update_data()
+
+    assert coordinator.position_history(provider, "Glacé De Bock #1") is not None
+    assert coordinator.position_history(provider, "Glacé De Bock #2") is None
+    assert coordinator.position_history(provider, "") is None
@@ -1,34 +1,39 @@
-import pytest
-from custom_components.ice_cream_benelux.sensor import DeKremkerreMelleSensor
+from unittest.mock import MagicMock
 
-class MockDeKremkerreMelleSensor(DeKremkerreMelleSensor):
-    async def get_vans(self):
-        return [
-            {
-                "truck_ref": "dk2",
-                "company_ref": "de-kremkerre",
-                "name": "De Kremvélo #2",
-                "status": "online",
-                "location": {
-                    "lat": 51.0452559,
-                    "lon": 3.7526505
-               }
-            }
-        ]
-
-mock_sensor = MockDeKremkerreMelleSensor(
-    config={},
-    company="De Kremkerre Melle",
-    user_lat=51.1658,
-    user_lon=4.4251
+from custom_components.ice_cream_benelux.coordinator import IceCreamFeedCoordinator
+from custom_components.ice_cream_benelux.providers import (
+    IJSJESRADAR_URL,
+    PROVIDERS,
+    Van,
+    normalize_vans,
 )
+from custom_components.ice_cream_benelux.sensor import IceCreamVanSensor
+
+PROVIDER = PROVIDERS["de_kremkerre_melle"]
+VANS = [
+    {
+        "truck_ref": "dk2",
+        "company_ref": "de-kremkerre",
+        "name": "De Kremvélo #2",
+        "status": "online",
+        "location": {"lat": 51.0452559, "lon": 3.7526505},
+    }
+]
+
+
+def test_normalize_vans():
+    assert normalize_vans(PROVIDER, VANS) == [
+        Van("De Kremvélo #2", 51.0452559, 3.7526505, "online")
+    ]
+
 
-@pytest.mark.asyncio
-async def test_get_nearest_van():
-    nearest_van = await mock_sensor.get_nearest_van()
-    assert nearest_van is not None
-    assert nearest_van["label"] == "De Kremvélo #2"
-    assert nearest_van["latitude"] == 51.0452559
-    assert nearest_van["longitude"] == 3.7526505
-    assert nearest_van["distance"] == 48.82
+def test_nearest_van():
+    coordinator = IceCreamFeedCoordinator(MagicMock(), IJSJESRADAR_URL, None)
+    coordinator.data = VANS
+    sensor = IceCreamVanSensor(
+        {}, "De Kremkerre Melle", 51.1658, 4.4251, coordinator, PROVIDER
+    )
 
+    assert sensor.update_from_feed()
+    assert sensor.state == 48.82
+    assert sensor.extra_state_attributes["label"] == "De Kremvélo #2"
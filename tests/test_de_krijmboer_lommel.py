@@ -1,35 +1,48 @@
-import pytest
-from custom_components.ice_cream_benelux.sensor import DeKrijmboerLommelSensor
+from unittest.mock import MagicMock
 
-class MockDeKrijmboerLommelSensor(DeKrijmboerLommelSensor):
-    async def get_vans(self):
-        return {
-            "data": [
-                {
-                    "title": "#1 Pistache",
-                    "latitude": 51.2328,
-                    "longitude": 5.3286117,
-                },
-                {
-                    "title": "#5 Mokka",
-                    "latitude": 51.221215,
-                    "longitude": 5.4153667,
-                }
-            ]
-        }
-
-mock_sensor = MockDeKrijmboerLommelSensor(
-    config={},
-    company="De Krijmboer Lommel",
-    user_lat=51.221215,
-    user_lon=5.4153667
+from custom_components.ice_cream_benelux.coordinator import IcecorpCoordinator
+from custom_components.ice_cream_benelux.providers import (
+    ICECORP_URL,
+    PROVIDERS,
+    normalize_vans,
 )
+from custom_components.ice_cream_benelux.sensor import IceCreamVanSensor
+
+PROVIDER = PROVIDERS["de_krijmboer_lommel"]
+PAYLOAD = {
+    "data": [
+        {
+            "title": "#1 Pistache",
+            "latitude": 51.2328,
+            "longitude": 5.3286117,
+        },
+        {
+            "title": "#5 Mokka",
+            "latitude": 51.221215,
+            "longitude": 5.4153667,
+        },
+    ]
+}
+
+
+def test_normalize_vans():
+    vans = normalize_vans(PROVIDER, PAYLOAD)
+    assert [(van.label, van.latitude, van.longitude) for van in vans] == [
+        ("#1 Pistache", 51.2328, 5.3286117),
+        ("#5 Mokka", 51.221215, 5.4153667),
+    ]
+
+
+def test_nearest_van():
+    coordinator = IcecorpCoordinator(MagicMock(), ICECORP_URL, None)
+    coordinator.data = {PROVIDER.company_id: PAYLOAD["data"]}
+    sensor = IceCreamVanSensor(
+        {}, "De Krijmboer Lommel", 51.221215, 5.4153667, coordinator, PROVIDER
+    )
 
-@pytest.mark.asyncio
-async def test_get_nearest_van():
-    nearest_van = await mock_sensor.get_nearest_van()
-    assert nearest_van is not None
-    assert nearest_van["label"] == "#5 Mokka"
-    assert nearest_van["latitude"] == 51.221215
-    assert nearest_van["longitude"] == 5.4153667
-    assert nearest_van["distance"] == 0.0
+    assert sensor.update_from_feed()
+    assert sensor.state == 0.0
+    attributes = sensor.extra_state_attributes
+    assert attributes["label"] == "#5 Mokka"
+    assert attributes["latitude"] == 51.221215
+    assert attributes["longitude"] == 5.4153667
@@ -0,0 +1,54 @@
+from types import SimpleNamespace
+
+import pytest
+
+from custom_components.ice_cream_benelux import sensor
+from custom_components.ice_cream_benelux.const import (
+    CONF_COMPANIES,
+    CONF_LATITUDE,
+    CONF_LONGITUDE,
+    DOMAIN,
+)
+from custom_components.ice_cream_benelux.diagnostics import (
+    async_get_config_entry_diagnostics,
+)
+from custom_components.ice_cream_benelux.providers import PITZ_URL
+
+
+async def restore_nothing(hass, coordinators):
+    return []
+
+
+@pytest.mark.asyncio
+async def test_diagnostics_show_feed_metrics(hass, monkeypatch):
+    monkeypatch.setattr(sensor, "async_restore_feeds", restore_nothing)
+    entry = SimpleNamespace(
+        entry_id="entry",
+        data={
+            CONF_LATITUDE: 51.0,
+            CONF_LONGITUDE: 4.0,
+            CONF_COMPANIES: ["pitz_stekene"],
+        },
+        options={},
+    )
+    added = []
+    entry_sensors = sensor.EntrySensors(hass, entry, added.extend)
+    await entry_sensors.async_update()
+    hass.data[DOMAIN][entry.entry_id] = entry_sensors
+    [coordinator] = entry_sensors.coordinators
+    coordinator.metrics.record_response(0.2, 512, False)
+
+    diagnostics = await async_get_config_entry_diagnostics(hass, entry)
+
+    assert diagnostics["data"][CONF_LATITUDE] == "**REDACTED**"
+    feed = diagnostics["feeds"][PITZ_URL]
+    assert feed["metrics"]["requests"] == 1
+    assert feed["metrics"]["last_size"] == 512
+    diagnostic_sensors = {
+        s.entity_description.key: s
+        for s in added
+        if isinstance(s, sensor.FeedMetricSensor)
+    }
+    assert diagnostic_sensors["feed_size"].native_value == 512
+    assert diagnostic_sensors["request_latency"].native_value == 200.0
+    assert diagnostic_sensors["cache_hit_ratio"].native_value == 0.0
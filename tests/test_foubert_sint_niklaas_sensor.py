@@ -1,35 +1,45 @@
-import pytest
-from custom_components.ice_cream_benelux.sensor import FoubertSintNiklaasSensor
+from unittest.mock import MagicMock
 
-class MockFoubertSintNiklaasSensor(FoubertSintNiklaasSensor):
-    async def get_vans(self):
-        return {
-            "data": [
-                {
-                    "title": "#1 Vanille",
-                    "latitude": 51.1657,
-                    "longitude": 4.4250,
-                },
-                {
-                    "title": "#5 Limoncello",
-                    "latitude": 51.1658,
-                    "longitude": 4.4251,
-                }
-            ]
-        }
-
-mock_sensor = MockFoubertSintNiklaasSensor(
-    config={},
-    company="Foubert Sint-Niklaas",
-    user_lat=51.1658,
-    user_lon=4.4251
+from custom_components.ice_cream_benelux.coordinator import IcecorpCoordinator
+from custom_components.ice_cream_benelux.providers import (
+    ICECORP_URL,
+    PROVIDERS,
+    normalize_vans,
 )
+from custom_components.ice_cream_benelux.sensor import IceCreamVanSensor
+
+PROVIDER = PROVIDERS["foubert_sint_niklaas"]
+PAYLOAD = {
+    "data": [
+        {
+            "title": "#1 Vanille",
+            "latitude": 51.1657,
+            "longitude": 4.4250,
+        },
+        {
+            "title": "#5 Limoncello",
+            "latitude": 51.1658,
+            "longitude": 4.4251,
+        },
+    ]
+}
+
+
+def test_normalize_vans():
+    vans = normalize_vans(PROVIDER, PAYLOAD)
+    assert [van.label for van in vans] == ["#1 Vanille", "#5 Limoncello"]
+
+
+def test_nearest_van():
+    coordinator = IcecorpCoordinator(MagicMock(), ICECORP_URL, None)
+    coordinator.data = {PROVIDER.company_id: PAYLOAD["data"]}
+    sensor = IceCreamVanSensor(
+        {}, "Foubert Sint-Niklaas", 51.1658, 4.4251, coordinator, PROVIDER
+    )
 
-@pytest.mark.asyncio
-async def test_get_nearest_van():
-    nearest_van = await mock_sensor.get_nearest_van()
-    assert nearest_van is not None
-    assert nearest_van["label"] == "#5 Limoncello"
-    assert nearest_van["latitude"] == 51.1658
-    assert nearest_van["longitude"] == 4.4251
-    assert nearest_van["distance"] == 0.0
+    assert sensor.update_from_feed()
+    assert sensor.state == 0.0
+    attributes = sensor.extra_state_attributes
+    assert attributes["label"] == "#5 Limoncello"
+    assert attributes["latitude"] == 51.1658
+    assert attributes["longitude"] == 4.4251
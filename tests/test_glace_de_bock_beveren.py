@@ -1,72 +1,78 @@
-import pytest
-from custom_components.ice_cream_benelux.sensor import GlaceDeBockBeverenSensor
+from unittest.mock import MagicMock
 
-class GlaceDeBockBeverenSensor(GlaceDeBockBeverenSensor):
-    async def get_vans(self):
-        return [
-            {
-                "truck_ref": "db1",
-                "company_ref": "de-bock",
-                "name": "Glacé De Bock #1",
-                "status": "online",
-                "location": {"lat": 51.1784796, "lon": 4.2148736},
-            },
-            {
-                "truck_ref": "db2",
-                "company_ref": "de-bock",
-                "name": "Glacé De Bock #2",
-                "status": "online",
-                "location": {"lat": 51.1984796, "lon": 4.2168736},
-            }
-        ]
+from custom_components.ice_cream_benelux.coordinator import IceCreamFeedCoordinator
+from custom_components.ice_cream_benelux.providers import (
+    IJSJESRADAR_URL,
+    PROVIDERS,
+    normalize_vans,
+)
+from custom_components.ice_cream_benelux.sensor import IceCreamVanSensor
 
+PROVIDER = PROVIDERS["glace_de_bock_beveren"]
 
-mock_sensor = GlaceDeBockBeverenSensor(
-    config={},
-    company="Foubert Sint-Niklaas",
-    user_lat=51.1658,
-    user_lon=4.4251,
-)
 
+def vans(status):
+    return [
+        {
+            "truck_ref": "db1",
+            "company_ref": "de-bock",
+            "name": "Glacé De Bock #1",
+            "status": status,
+            "location": {"lat": 51.1784796, "lon": 4.2148736},
+        },
+        {
+            "truck_ref": "db2",
+            "company_ref": "de-bock",
+            "name": "Glacé De Bock #2",
+            "status": status,
+            "location": {"lat": 51.1984796, "lon": 4.2168736},
+        },
+    ]
 
-@pytest.mark.asyncio
-async def test_get_nearest_van_1():
-    nearest_van = await mock_sensor.get_nearest_van()
-    assert nearest_van is not None
-    assert nearest_van["label"] == "Glacé De Bock #1"
-    assert nearest_van["latitude"] == 51.1784796
-    assert nearest_van["longitude"] == 4.2148736
-    assert nearest_van["distance"] == 14.72
 
-class GlaceDeBockBeverenSensor2(GlaceDeBockBeverenSensor):
-    async def get_vans(self):
-        return [
-            {
-                "truck_ref": "db1",
-                "company_ref": "de-bock",
-                "name": "Glacé De Bock #1",
-                "status": "offline",
-                "location": {"lat": 51.1784796, "lon": 4.2148736},
-            },
-            {
-                "truck_ref": "db2",
-                "company_ref": "de-bock",
-                "name": "Glacé De Bock #2",
-                "status": "offline",
-                "location": {"lat": 51.1984796, "lon": 4.2168736},
-            }
-        ]
+def glace_de_bock_sensor(payload):
+    coordinator = IceCreamFeedCoordinator(MagicMock(), IJSJESRADAR_URL, None)
+    coordinator.data = payload
+    return IceCreamVanSensor(
+        {}, "Glace De Bock Beveren", 51.1658, 4.4251, coordinator, PROVIDER
+    )
 
 
-mock_sensor2 = GlaceDeBockBeverenSensor2(
-    config={},
-    company="Foubert Sint-Niklaas",
-    user_lat=51.1658,
-    user_lon=4.4251,
-)
+def test_offline_vans_are_skipped():
+    assert [van.label for van in normalize_vans(PROVIDER, vans("online"))] == [
+        "Glacé De Bock #1",
+        "Glacé De Bock #2",
+    ]
+    assert normalize_vans(PROVIDER, vans("offline")) == []
+
+
+def test_all_vans_offline():
+    sensor = glace_de_bock_sensor(vans("offline"))
+
+    assert sensor.update_from_feed()
+    assert sensor.state is None
+
 
+def test_nearest_vans_are_ranked_records():
+    sensor = glace_de_bock_sensor(vans("online"))
 
-@pytest.mark.asyncio
-async def test_get_nearest_van_all_vans_offline():
-    nearest_van = await mock_sensor2.get_nearest_van()
-    assert nearest_van is None
+    assert sensor.update_from_feed()
+    assert sensor.state == 14.72
+    assert sensor.extra_state_attributes["nearest_vans"] == [
+        {
+            "company": "Glace De Bock Beveren",
+            "label": "Glacé De Bock #1",
+            "latitude": 51.1784796,
+            "longitude": 4.2148736,
+            "status": "online",
+            "distance": 14.72,
+        },
+        {
+            "company": "Glace De Bock Beveren",
+            "label": "Glacé De Bock #2",
+            "latitude": 51.1984796,
+            "longitude": 4.2168736,
+            "status": "online",
+            "distance": 14.96,
+        },
+    ]
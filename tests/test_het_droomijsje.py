@@ -1,60 +1,59 @@
-import pytest
-from custom_components.ice_cream_benelux.sensor import HetDroomijsjeBreskensSensor
-
-class MockHetDroomijsjeBreskensSensor(HetDroomijsjeBreskensSensor):
-    async def get_vans(self):
-        return [
-            {
-                "truck_ref": "di1",
-                "company_ref": "het-droomijsje",
-                "name": "Het Droomijsje",
-                "status": "online",
-                "location": {
-                    "lat": 51.2718988,
-                    "lon": 3.454313
-               }
-            },
-            {
-                "truck_ref": "di2",
-                "company_ref": "het-droomijsje",
-                "name": "Het Droomijsje Camping",
-                "status": "online",
-                "location": {
-                    "lat": 51.380838,
-                    "lon": 3.4014555
-               }
-            }
-        ]
-
-mock_sensor = MockHetDroomijsjeBreskensSensor(
-    config={},
-    company="Het Droomijsje Breskens",
-    user_lat=51.380838,
-    user_lon=3.4014555
-)
+from unittest.mock import MagicMock
 
-@pytest.mark.asyncio
-async def test_get_nearest_van():
-    nearest_van = await mock_sensor.get_nearest_van()
-    assert nearest_van is not None
-    assert nearest_van["label"] == "Het Droomijsje Camping"
-    assert nearest_van["latitude"] == 51.380838
-    assert nearest_van["longitude"] == 3.4014555
-    assert nearest_van["distance"] == 0
-
-class MockHetDroomijsjeBreskensSensor2(HetDroomijsjeBreskensSensor):
-    async def get_vans(self):
-        return []
-
-mock_sensor = MockHetDroomijsjeBreskensSensor2(
-    config={},
-    company="Het Droom Ijsje Breskens",
-    user_lat=51.380838,
-    user_lon=3.4014555
+from custom_components.ice_cream_benelux.coordinator import IceCreamFeedCoordinator
+from custom_components.ice_cream_benelux.providers import (
+    IJSJESRADAR_URL,
+    PROVIDERS,
+    normalize_vans,
 )
+from custom_components.ice_cream_benelux.sensor import IceCreamVanSensor
+
+PROVIDER = PROVIDERS["het_droomijsje_breskens"]
+VANS = [
+    {
+        "truck_ref": "di1",
+        "company_ref": "het-droomijsje",
+        "name": "Het Droomijsje",
+        "status": "online",
+        "location": {"lat": 51.2718988, "lon": 3.454313},
+    },
+    {
+        "truck_ref": "di2",
+        "company_ref": "het-droomijsje",
+        "name": "Het Droomijsje Camping",
+        "status": "online",
+        "location": {"lat": 51.380838, "lon": 3.4014555},
+    },
+]
+
+
+def droomijsje_sensor(vans):
+    coordinator = IceCreamFeedCoordinator(MagicMock(), IJSJESRADAR_URL, None)
+    coordinator.data = vans
+    return IceCreamVanSensor(
+        {}, "Het Droomijsje Breskens", 51.380838, 3.4014555, coordinator, PROVIDER
+    )
+
+
+def test_normalize_vans():
+    vans = normalize_vans(PROVIDER, VANS)
+    assert [van.label for van in vans] == ["Het Droomijsje", "Het Droomijsje Camping"]
+
+
+def test_nearest_van():
+    sensor = droomijsje_sensor(VANS)
+
+    assert sensor.update_from_feed()
+    assert sensor.state == 0
+    attributes = sensor.extra_state_attributes
+    assert attributes["label"] == "Het Droomijsje Camping"
+    assert attributes["latitude"] == 51.380838
+    assert attributes["longitude"] == 3.4014555
+
 
-@pytest.mark.asyncio
-async def test_get_nearest_van():
-    nearest_van = await mock_sensor.get_nearest_van()
-    assert nearest_van is None
+def test_no_vans():
+    sensor = droomijsje_sensor([])
 
+    assert sensor.update_from_feed()
+    assert sensor.state is None
+    assert "label" not in sensor.extra_state_attributes
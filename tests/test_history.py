@@ -0,0 +1,35 @@
+import pytest
+
+from custom_components.ice_cream_benelux.history import PositionHistory
+from custom_components.ice_cream_benelux.utils_location import ReferencePoint
+
+HOME = ReferencePoint(51.0, 4.0)
+
+
+def test_motion_needs_two_positions():
+    history = PositionHistory()
+    assert history.motion(HOME) is None
+    history.append(0, 51.1, 4.0)
+    assert history.motion(HOME) is None
+
+
+def test_motion_of_approaching_van():
+    history = PositionHistory()
+    # Driving south towards home at 0.01 degree latitude per minute
+    for minute in range(5):
+        history.append(minute * 60, 51.1 - minute * 0.01, 4.0)
+    motion = history.motion(HOME)
+    assert motion["heading"] == 180
+    assert motion["speed"] == pytest.approx(66.7, abs=0.1)
+    assert motion["approach_rate"] == pytest.approx(66.7, abs=0.1)
+    assert motion["eta"] == pytest.approx(6.0, abs=0.1)
+
+
+def test_ring_buffer_keeps_latest_positions():
+    history = PositionHistory(size=3)
+    for second in range(5):
+        history.append(second, 51.0 + second, 4.0)
+    history.append(4, 60.0, 4.0)  # Out of order, ignored
+    assert len(history) == 3
+    assert history._position(0) == (2, 53.0, 4.0)
+    assert history._position(2) == (4, 55.0, 4.0)
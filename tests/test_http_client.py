@@ -0,0 +1,338 @@
+import asyncio
+import json
+import logging
+import time
+
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+import pytest
+
+from custom_components.ice_cream_benelux.http_client import (
+    CIRCUIT_FAILURE_THRESHOLD,
+    CircuitBreaker,
+    HTTPClient,
+    parse_retry_after,
+)
+from custom_components.ice_cream_benelux.metrics import FeedMetrics
+
+VANS = [{"name": "Van #1", "location": {"lat": 51.0, "lon": 4.0}}]
+
+
+def create_app(calls, vans=VANS):
+    async def handler(request):
+        calls.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return web.Response(status=304)
+        return web.json_response(vans, headers={"ETag": '"v1"'})
+
+    app = web.Application()
+    app.router.add_get("/status.php", handler)
+    return app
+
+
+@pytest.mark.asyncio
+async def test_conditional_get_returns_cached_object():
+    calls = []
+    async with TestServer(create_app(calls)) as server:
+        client = HTTPClient(logger=logging.getLogger(__name__))
+        url = str(server.make_url("/status.php"))
+        first = await client.request_with_retry(url)
+        second = await client.request_with_retry(url)
+        await client.async_close()
+
+    assert first == VANS
+    assert second is first
+    assert calls == [None, '"v1"']
+
+
+@pytest.mark.asyncio
+async def test_empty_body_is_retried():
+    bodies = [b"", b'{"data": []}']
+
+    async def handler(request):
+        return web.Response(body=bodies.pop(0), content_type="application/json")
+
+    app = web.Application()
+    app.router.add_get("/markers", handler)
+    async with TestServer(app) as server:
+        client = HTTPClient(logger=logging.getLogger(__name__))
+        data = await client.request_with_retry(
+            str(server.make_url("/markers")), wait_time=0
+        )
+        await client.async_close()
+
+    assert data == {"data": []}
+    assert bodies == []
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_fetch():
+    calls = []
+
+    async def handler(request):
+        calls.append(request.path)
+        await asyncio.sleep(0.05)
+        return web.json_response(VANS)
+
+    app = web.Application()
+    app.router.add_get("/status.php", handler)
+    async with TestServer(app) as server:
+        client = HTTPClient(logger=logging.getLogger(__name__))
+        url = str(server.make_url("/status.php"))
+        results = await asyncio.gather(
+            *(client.request_with_retry(url) for _ in range(5))
+        )
+        await client.async_close()
+
+    assert calls == ["/status.php"]
+    assert all(result is results[0] for result in results)
+
+
+@pytest.mark.asyncio
+async def test_no_wait_after_last_attempt():
+    async def handler(request):
+        return web.Response(status=503)
+
+    app = web.Application()
+    app.router.add_get("/api/", handler)
+    async with TestServer(app) as server:
+        client = HTTPClient(logger=logging.getLogger(__name__))
+        url = str(server.make_url("/api/"))
+        data = await asyncio.wait_for(
+            client.request_with_retry(url, retries=1, wait_time=60),
+            timeout=5,
+        )
+        await client.async_close()
+
+    assert data == {}
+    assert client.last_status(url) == 503
+
+
+@pytest.mark.asyncio
+async def test_circuit_opens_after_repeated_failures():
+    calls = []
+
+    async def handler(request):
+        calls.append(request.path)
+        return web.Response(status=503)
+
+    app = web.Application()
+    app.router.add_get("/api/", handler)
+    async with TestServer(app) as server:
+        client = HTTPClient(logger=logging.getLogger(__name__))
+        url = str(server.make_url("/api/"))
+        for _ in range(CIRCUIT_FAILURE_THRESHOLD + 2):
+            assert await client.request_with_retry(url, retries=1) == {}
+        await client.async_close()
+
+    assert len(calls) == CIRCUIT_FAILURE_THRESHOLD
+
+
+def test_circuit_breaker_probes_after_recovery_time():
+    breaker = CircuitBreaker(failure_threshold=2, recovery_time=60)
+    breaker.record_failure(0)
+    assert breaker.allow_request(1)
+    breaker.record_failure(1)
+    assert not breaker.allow_request(30)
+    assert breaker.allow_request(61)
+    # Only one probe at a time
+    assert not breaker.allow_request(62)
+    breaker.record_success()
+    assert breaker.allow_request(63)
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("120") == 120
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+
+@pytest.mark.asyncio
+async def test_hung_request_times_out():
+    async def handler(request):
+        await asyncio.sleep(5)
+        return web.json_response(VANS)
+
+    app = web.Application()
+    app.router.add_get("/status.php", handler)
+    async with TestServer(app) as server:
+        client = HTTPClient(logger=logging.getLogger(__name__))
+        url = str(server.make_url("/status.php"))
+        data = await asyncio.wait_for(
+            client.request_with_retry(
+                url, retries=1, timeout=aiohttp.ClientTimeout(total=0.1)
+            ),
+            timeout=2,
+        )
+        await client.async_close()
+
+    assert data == {}
+    assert client.last_status(url) is None
+
+
+@pytest.mark.asyncio
+async def test_hung_retry_is_cut_off_at_deadline():
+    async def handler(request):
+        await asyncio.sleep(5)
+        return web.json_response(VANS)
+
+    app = web.Application()
+    app.router.add_get("/status.php", handler)
+    async with TestServer(app) as server:
+        client = HTTPClient(logger=logging.getLogger(__name__))
+        url = str(server.make_url("/status.php"))
+        start = time.monotonic()
+        # The retry starts 0.9 seconds in, with 0.1 seconds left
+        data = await client.request_with_retry(
+            url,
+            wait_time=0,
+            deadline=1.0,
+            timeout=aiohttp.ClientTimeout(total=0.9),
+        )
+        elapsed = time.monotonic() - start
+        await client.async_close()
+
+    assert data == {}
+    assert elapsed < 1.2
+
+
+BAD_GATEWAY_PAGE = "<html><body><h1>502 Bad Gateway</h1></body></html>"
+
+
+def create_html_app(calls):
+    async def handler(request):
+        calls.append(request.path)
+        return web.Response(text=BAD_GATEWAY_PAGE, content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/status.php", handler)
+    return app
+
+
+@pytest.mark.asyncio
+async def test_invalid_json_is_retried_and_counted():
+    calls = []
+    async with TestServer(create_html_app(calls)) as server:
+        client = HTTPClient(logger=logging.getLogger(__name__))
+        metrics = FeedMetrics()
+        data = await client.request_with_retry(
+            str(server.make_url("/status.php")), wait_time=0, metrics=metrics
+        )
+        await client.async_close()
+
+    assert data == {}
+    assert len(calls) == 3
+    assert metrics.retries == 2
+    assert metrics.failures == 1
+    assert metrics.latency.count == 3
+
+
+@pytest.mark.asyncio
+async def test_streamed_body_that_is_not_an_array_is_retried():
+    calls = []
+    async with TestServer(create_html_app(calls)) as server:
+        client = HTTPClient(logger=logging.getLogger(__name__))
+        url = str(server.make_url("/status.php"))
+        metrics = FeedMetrics()
+        results = await asyncio.gather(
+            client.request_with_retry(
+                url, wait_time=0, keep=is_online, metrics=metrics
+            ),
+            client.request_with_retry(url, wait_time=0, keep=is_online),
+        )
+        await client.async_close()
+
+    assert results == [{}, {}]
+    assert len(calls) == 3
+    assert metrics.retries == 2
+    assert metrics.failures == 1
+    assert metrics.latency.count == 3
+    assert metrics.last_size == len(BAD_GATEWAY_PAGE)
+
+
+@pytest.mark.asyncio
+async def test_streamed_array_is_filtered_and_cached_per_filter():
+    calls = []
+    vans = [
+        {"name": "Van #1", "status": "online"},
+        {"name": "Van #2", "status": "offline"},
+    ]
+    async with TestServer(create_app(calls, vans)) as server:
+        client = HTTPClient(logger=logging.getLogger(__name__))
+        url = str(server.make_url("/status.php"))
+        online = await client.request_with_retry(url, keep=is_online)
+        again = await client.request_with_retry(url, keep=is_online)
+        everything = await client.request_with_retry(url)
+        await client.async_close()
+
+    assert online == vans[:1]
+    assert again is online
+    assert everything == vans
+    assert calls == [None, '"v1"', None]
+
+
+def is_online(van):
+    return van["status"] == "online"
+
+
+@pytest.mark.asyncio
+async def test_requests_per_host_are_capped():
+    running = []
+    peak = []
+
+    async def handler(request):
+        running.append(request.path)
+        peak.append(len(running))
+        await asyncio.sleep(0.05)
+        running.remove(request.path)
+        return web.json_response(VANS)
+
+    app = web.Application()
+    app.router.add_get("/{feed}", handler)
+    async with TestServer(app) as server:
+        client = HTTPClient(logger=logging.getLogger(__name__))
+        client.max_requests_per_host = 2
+        results = await asyncio.gather(
+            *(
+                client.request_with_retry(str(server.make_url(f"/feed{i}")))
+                for i in range(5)
+            )
+        )
+        await client.async_close()
+
+    assert results == [VANS] * 5
+    assert max(peak) == 2
+
+
+@pytest.mark.asyncio
+async def test_attempts_are_recorded_in_metrics():
+    statuses = [503, 200, 200]
+
+    async def handler(request):
+        if request.headers.get("If-None-Match") == '"v1"':
+            return web.Response(status=304)
+        return web.json_response(
+            VANS, status=statuses.pop(0), headers={"ETag": '"v1"'}
+        )
+
+    app = web.Application()
+    app.router.add_get("/status.php", handler)
+    async with TestServer(app) as server:
+        client = HTTPClient(logger=logging.getLogger(__name__))
+        url = str(server.make_url("/status.php"))
+        metrics = FeedMetrics()
+        await client.request_with_retry(
+            url, wait_time=0, retry_statuses=[503], metrics=metrics
+        )
+        await client.request_with_retry(url, metrics=metrics)
+        await client.async_close()
+
+    size = len(json.dumps(VANS))
+    assert metrics.latency.count == 3
+    assert metrics.retries == 1
+    assert metrics.failures == 0
+    assert metrics.not_modified == 1
+    assert metrics.bytes_received == 2 * size
+    assert metrics.last_size == size
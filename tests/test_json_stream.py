@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from custom_components.ice_cream_benelux.json_stream import (
+    JSONArraySplitter,
+    read_json_array,
+)
+
+RECORDS = [
+    {"name": 'Van "#1", [north]', "location": {"lat": 51.0, "lon": 4.0}},
+    {"name": "Van \\#2 {south}", "tags": ["a", {"b": []}]},
+    3,
+    "four, five",
+    None,
+]
+PAYLOAD = json.dumps(RECORDS, indent=1).encode()
+
+
+async def stream(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+def test_split_at_every_chunk_boundary():
+    for pos in range(len(PAYLOAD) + 1):
+        splitter = JSONArraySplitter()
+        elements = splitter.feed(PAYLOAD[:pos]) + splitter.feed(PAYLOAD[pos:])
+        assert [json.loads(element) for element in elements] == RECORDS
+        assert splitter.finished
+
+
+def test_split_byte_by_byte():
+    splitter = JSONArraySplitter()
+    elements = []
+    for pos in range(len(PAYLOAD)):
+        elements += splitter.feed(PAYLOAD[pos : pos + 1])
+    assert [json.loads(element) for element in elements] == RECORDS
+
+
+def test_split_rejects_objects():
+    with pytest.raises(ValueError):
+        JSONArraySplitter().feed(b'{"data": []}')
+
+
+@pytest.mark.asyncio
+async def test_read_keeps_wanted_elements():
+    kept = await read_json_array(
+        stream(PAYLOAD[:10], PAYLOAD[10:]), json.loads, lambda r: isinstance(r, dict)
+    )
+    assert kept == RECORDS[:2]
+
+
+@pytest.mark.asyncio
+async def test_read_empty_and_incomplete_bodies():
+    assert await read_json_array(stream(b"", b" \n"), json.loads, bool) is None
+    assert await read_json_array(stream(b"[]"), json.loads, bool) == []
+    with pytest.raises(ValueError):
+        await read_json_array(stream(PAYLOAD[:-1]), json.loads, bool)
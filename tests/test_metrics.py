@@ -0,0 +1,44 @@
+from custom_components.ice_cream_benelux.metrics import FeedMetrics
+
+
+def test_feed_metrics():
+    metrics = FeedMetrics()
+    assert metrics.cache_hit_ratio is None
+
+    metrics.record_response(0.05, 1200, False)
+    metrics.record_retry()
+    metrics.record_error(3.0)
+    metrics.record_response(12.0, 0, True)
+
+    assert metrics.cache_hit_ratio == 1 / 3
+    assert metrics.as_dict() == {
+        "requests": 3,
+        "retries": 1,
+        "failures": 0,
+        "not_modified": 1,
+        "cache_hit_ratio": 1 / 3,
+        "bytes_received": 1200,
+        "last_size": 1200,
+        "latency": {
+            "count": 3,
+            "last_ms": 12000.0,
+            "average_ms": 5016.7,
+            "buckets": {
+                "le_0.1s": 1,
+                "le_0.25s": 0,
+                "le_0.5s": 0,
+                "le_1s": 0,
+                "le_2.5s": 0,
+                "le_5s": 1,
+                "le_10s": 0,
+                "slower": 1,
+            },
+        },
+        "parse_time": {"count": 0, "last_ms": None, "average_ms": None},
+        "rank_time": {"count": 0, "last_ms": None, "average_ms": None},
+    }
+
+    with metrics.parse_time.measure():
+        pass
+    assert metrics.parse_time.count == 1
+    assert metrics.parse_time.last >= 0
@@ -0,0 +1,71 @@
+from custom_components.ice_cream_benelux.providers import (
+    PROVIDERS,
+    RecordFilter,
+    Van,
+    normalize_vans,
+)
+
+
+def test_normalize_shared_feed_keeps_company_vans():
+    payload = [
+        {
+            "company_ref": "de-bock",
+            "name": "Glacé De Bock #1",
+            "status": "online",
+            "location": {"lat": 51.1784796, "lon": 4.2148736},
+        },
+        {
+            "company_ref": "de-kremkerre",
+            "name": "De Kremvélo #2",
+            "status": "online",
+            "location": {"lat": 51.0452559, "lon": 3.7526505},
+        },
+        {
+            "company_ref": "de-bock",
+            "name": "Glacé De Bock #2",
+            "status": "offline",
+            "location": {"lat": 51.1984796, "lon": 4.2168736},
+        },
+    ]
+    vans = normalize_vans(PROVIDERS["glace_de_bock_beveren"], payload)
+    assert [van.as_dict() for van in vans] == [
+        {
+            "label": "Glacé De Bock #1",
+            "latitude": 51.1784796,
+            "longitude": 4.2148736,
+            "status": "online",
+        }
+    ]
+
+
+def test_normalize_pitz():
+    payload = [
+        {"naam": "Pitz 1", "lat": 51.2, "lng": 4.1, "active": True},
+        {"naam": "Pitz 2", "lat": 51.3, "lng": 4.2, "active": False},
+        {"naam": "Pitz 3", "lat": None, "lng": 4.2, "active": True},
+    ]
+    vans = normalize_vans(PROVIDERS["pitz_stekene"], payload)
+    assert vans == [Van("Pitz 1", 51.2, 4.1, "active")]
+
+
+def test_normalize_empty_payload():
+    assert normalize_vans(PROVIDERS["van_de_walle_temse"], {}) == []
+    assert normalize_vans(PROVIDERS["joris_beerse"], {"data": []}) == []
+
+
+def test_record_filter_keeps_online_vans_of_providers():
+    keep = RecordFilter(
+        frozenset(
+            {PROVIDERS["glace_de_bock_beveren"], PROVIDERS["de_kremkerre_melle"]}
+        )
+    )
+    assert keep({"company_ref": "de-bock", "status": "online"})
+    assert keep({"company_ref": "de-kremkerre", "status": "online"})
+    assert not keep({"company_ref": "de-bock", "status": "offline"})
+    assert not keep({"company_ref": "het-droomijsje", "status": "online"})
+    assert not keep("de-bock")
+    assert keep == RecordFilter(
+        frozenset(
+            {PROVIDERS["de_kremkerre_melle"], PROVIDERS["glace_de_bock_beveren"]}
+        )
+    )
@@ -0,0 +1,61 @@
+from datetime import datetime, time, timedelta
+
+from custom_components.ice_cream_benelux.scheduler import (
+    AdaptivePollingScheduler,
+    OperatingHours,
+)
+
+NOON = datetime(2024, 7, 1, 12, 0)
+HOURS = [OperatingHours(time(10, 0), time(22, 0))]
+
+
+def create_scheduler():
+    return AdaptivePollingScheduler(
+        fast_interval=timedelta(seconds=10),
+        base_interval=timedelta(seconds=30),
+        max_interval=timedelta(minutes=5),
+        near_distance=3.0,
+    )
+
+
+def test_polls_fast_when_van_is_near_or_approaching():
+    scheduler = create_scheduler()
+    assert scheduler.next_interval(NOON, HOURS, 2.0, False, False) == timedelta(
+        seconds=10
+    )
+    assert scheduler.next_interval(NOON, HOURS, 8.0, True, True) == timedelta(
+        seconds=10
+    )
+
+
+def test_backs_off_while_idle():
+    scheduler = create_scheduler()
+    intervals = [
+        scheduler.next_interval(NOON, [], None, False, False) for _ in range(5)
+    ]
+    assert intervals == [
+        timedelta(seconds=60),
+        timedelta(seconds=120),
+        timedelta(seconds=240),
+        timedelta(minutes=5),
+        timedelta(minutes=5),
+    ]
+    # Movement resets the back-off
+    assert scheduler.next_interval(NOON, [], 8.0, False, True) == timedelta(seconds=30)
+    assert scheduler.next_interval(NOON, [], 8.0, False, False) == timedelta(
+        seconds=60
+    )
+
+
+def test_waits_for_opening_outside_operating_hours():
+    scheduler = create_scheduler()
+    night = datetime(2024, 7, 1, 23, 0)
+    assert scheduler.next_interval(night, HOURS, 1.0, True, True) == timedelta(
+        hours=11
+    )
+
+
+def test_operating_hours_spanning_midnight():
+    hours = OperatingHours(time(18, 0), time(2, 0))
+    assert hours.is_open(datetime(2024, 7, 1, 1, 0))
+    assert not hours.is_open(NOON)
@@ -0,0 +1,177 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from custom_components.ice_cream_benelux import sensor
+from custom_components.ice_cream_benelux.const import (
+    CONF_COMPANIES,
+    CONF_LATITUDE,
+    CONF_LOCATIONS,
+    CONF_LONGITUDE,
+    DATA_COORDINATORS,
+    DATA_HTTP_CLIENT,
+    DOMAIN,
+    STATUS_OUT_OF_RANGE,
+)
+from custom_components.ice_cream_benelux.coordinator import IceCreamFeedCoordinator
+from custom_components.ice_cream_benelux.providers import (
+    IJSJESRADAR_URL,
+    PITZ_URL,
+    PROVIDERS,
+    Van,
+)
+
+
+async def restore_nothing(hass, coordinators):
+    return []
+
+
+@pytest.mark.asyncio
+async def test_options_only_add_and_remove_affected_sensors(hass, monkeypatch):
+    monkeypatch.setattr(sensor, "async_restore_feeds", restore_nothing)
+    entry = SimpleNamespace(
+        entry_id="entry",
+        data={
+            CONF_LATITUDE: 51.0,
+            CONF_LONGITUDE: 4.0,
+            CONF_COMPANIES: ["pitz_stekene", "joris_beerse"],
+            CONF_LOCATIONS: [],
+        },
+        options={},
+    )
+    added = []
+    entry_sensors = sensor.EntrySensors(hass, entry, added.extend)
+    await entry_sensors.async_update()
+    joris = added[1]
+
+    entry.options = {
+        **entry.data,
+        CONF_COMPANIES: ["pitz_stekene", "tartiste_deinze"],
+    }
+    joris.async_remove = AsyncMock()
+    await entry_sensors.async_update()
+
+    assert [
+        s.unique_id for s in added if isinstance(s, sensor.IceCreamVanSensor)
+    ] == [
+        "Ice Cream Benelux_pitz_stekene_51.0_4.0",
+        "Ice Cream Benelux_joris_beerse_51.0_4.0",
+        "Ice Cream Benelux_tartiste_deinze_51.0_4.0",
+    ]
+    joris.async_remove.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_unload_shuts_down_unused_feeds(hass, monkeypatch):
+    monkeypatch.setattr(sensor, "async_restore_feeds", restore_nothing)
+    entries = [
+        SimpleNamespace(
+            entry_id=entry_id,
+            data={
+                CONF_LATITUDE: 51.0,
+                CONF_LONGITUDE: 4.0,
+                CONF_COMPANIES: companies,
+            },
+            options={},
+        )
+        for entry_id, companies in (
+            ("home", ["pitz_stekene", "joris_beerse"]),
+            ("office", ["pitz_stekene"]),
+        )
+    ]
+    home, office = (
+        sensor.EntrySensors(hass, entry, lambda sensors: None) for entry in entries
+    )
+    await home.async_update()
+    await office.async_update()
+
+    await home.async_unload()
+    assert list(hass.data[DOMAIN][DATA_COORDINATORS]) == [PITZ_URL]
+    assert DATA_HTTP_CLIENT in hass.data[DOMAIN]
+
+    await office.async_unload()
+    assert hass.data[DOMAIN][DATA_COORDINATORS] == {}
+    assert DATA_HTTP_CLIENT not in hass.data[DOMAIN]
+
+
+def test_state_is_only_written_on_material_change():
+    coordinator = MagicMock(stale=False)
+    van_sensor = sensor.IceCreamVanSensor(
+        {}, "pitz_stekene", 51.0, 4.0, coordinator, PROVIDERS["pitz_stekene"]
+    )
+
+    def update(lat, distance, stale=False):
+        coordinator.stale = stale
+        coordinator.distances_for.return_value = (
+            [Van("Pitz 1", lat, 4.1, "active")],
+            [distance],
+        )
+        return van_sensor.update_from_feed()
+
+    assert update(51.2, 10.0)
+    # GPS jitter of a few meters
+    assert not update(51.20002, 10.001)
+    assert update(51.201, 10.08)
+    assert update(51.201, 10.08, stale=True)
+
+    van_sensor.thresholds = sensor.UpdateThresholds(min_interval=3600)
+    assert not update(51.3, 20.0, stale=True)
+    assert van_sensor.state == 10.08
+
+
+def test_vans_beyond_max_radius_are_out_of_range():
+    coordinator = IceCreamFeedCoordinator(MagicMock(), IJSJESRADAR_URL, None)
+    coordinator.data = [
+        {
+            "company_ref": "de-bock",
+            "name": "Glacé De Bock #1",
+            "status": "online",
+            "location": {"lat": 51.1784796, "lon": 4.2148736},
+        }
+    ]
+    van_sensor = sensor.IceCreamVanSensor(
+        {"max_radius": 10},
+        "glace_de_bock_beveren",
+        51.1658,
+        4.4251,
+        coordinator,
+        PROVIDERS["glace_de_bock_beveren"],
+    )
+
+    assert van_sensor.update_from_feed()
+    # The only van is 14.72 km away
+    assert van_sensor.state is None
+    assert van_sensor.extra_state_attributes["status"] == STATUS_OUT_OF_RANGE
+
+
+@pytest.mark.asyncio
+async def test_feed_diagnostics_are_shown_once_and_handed_over(hass, monkeypatch):
+    monkeypatch.setattr(sensor, "async_restore_feeds", restore_nothing)
+    added = {"home": [], "office": []}
+    for entry_id in added:
+        entry = SimpleNamespace(
+            entry_id=entry_id,
+            data={
+                CONF_LATITUDE: 51.0,
+                CONF_LONGITUDE: 4.0,
+                CONF_COMPANIES: ["pitz_stekene"],
+            },
+            options={},
+        )
+        entry_sensors = sensor.EntrySensors(hass, entry, added[entry_id].extend)
+        await entry_sensors.async_update()
+        hass.data[DOMAIN][entry_id] = entry_sensors
+
+    def diagnostics(entry_id):
+        return [s for s in added[entry_id] if isinstance(s, sensor.FeedMetricSensor)]
+
+    assert len(diagnostics("home")) == len(sensor.FEED_METRICS)
+    assert diagnostics("office") == []
+    assert not diagnostics("home")[0].entity_registry_enabled_default
+
+    await hass.data[DOMAIN].pop("home").async_unload()
+
+    assert [s.unique_id for s in diagnostics("office")] == [
+        s.unique_id for s in diagnostics("home")
+    ]
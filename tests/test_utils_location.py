@@ -0,0 +1,68 @@
+import pytest
+
+from custom_components.ice_cream_benelux import utils_location
+from custom_components.ice_cream_benelux.utils_location import (
+    ReferencePoint,
+    haversine,
+    haversine_matrix,
+    nearest_indices,
+)
+
+VANS = [(51.0452559, 3.7526505), (51.1784796, 4.2148736), (51.1658, 4.4251)]
+POINTS = [ReferencePoint(51.1658, 4.4251), ReferencePoint(51.380838, 3.4014555)]
+
+
+@pytest.mark.parametrize(
+    "matrix",
+    [haversine_matrix, utils_location._haversine_matrix_python],
+)
+def test_haversine_matrix_matches_haversine(matrix):
+    distances = matrix(VANS, POINTS)
+    assert len(distances) == len(POINTS)
+    for point, row in zip(POINTS, distances):
+        assert row == pytest.approx(
+            [haversine(*van, point.latitude, point.longitude) for van in VANS]
+        )
+
+
+def test_haversine_matrix_without_vans():
+    assert haversine_matrix([], POINTS) == [[], []]
+
+
+def test_reference_point_distance():
+    point = ReferencePoint(51.1658, 4.4251)
+    for lat, lon in VANS:
+        assert point.distance(lat, lon) == pytest.approx(
+            haversine(lat, lon, 51.1658, 4.4251)
+        )
+
+
+def test_bounding_box_contains_radius():
+    point = ReferencePoint(51.1658, 4.4251)
+    min_lat, max_lat, min_lon, max_lon = point.bounding_box(10)
+    assert point.distance(max_lat, point.longitude) == pytest.approx(10)
+    assert point.distance(point.latitude, max_lon) > 10
+    assert min_lat < point.latitude < max_lat
+    assert min_lon < point.longitude < max_lon
+
+
+def test_nearest_indices():
+    distances = [5.0, 1.0, 3.0, 1.0, 9.0]
+    assert nearest_indices(distances, 3) == [(1.0, 1), (1.0, 3), (3.0, 2)]
+    assert nearest_indices(distances, 3, max_distance=2.0) == [(1.0, 1), (1.0, 3)]
+    assert nearest_indices([], 3) == []
+
+
+def test_get_locations():
+    config = {
+        "latitude": 51.1658,
+        "longitude": 4.4251,
+        "locations": [{"name": "Office", "latitude": 51.05, "longitude": 3.72}],
+    }
+    assert utils_location.get_locations(config) == [
+        (None, 51.1658, 4.4251),
+        ("Office", 51.05, 3.72),
+    ]
+    assert utils_location.get_locations({"latitude": 1.0, "longitude": 2.0}) == [
+        (None, 1.0, 2.0)
+    ]